@@ -29,6 +29,7 @@ SCRAPING_CONFIG = {
     'reviews_per_bank': int(os.getenv('REVIEWS_PER_BANK', 450)),
     'max_retries': int(os.getenv('MAX_RETRIES', 3)),
     'retry_delay': int(os.getenv('RETRY_DELAY', 5)),
+    'concurrency': int(os.getenv('SCRAPER_CONCURRENCY', 4)),
     'lang': os.getenv('SCRAPER_LANG', 'en'),
     'country': os.getenv('SCRAPER_COUNTRY', 'et')
 }
@@ -37,10 +38,16 @@ DATA_PATHS = {
     'raw': 'data/raw',
     'processed': 'data/processed',
     'raw_reviews': 'data/raw/reviews_raw.csv',
+    'raw_reviews_parquet': 'data/raw/reviews_raw.parquet',
     'processed_reviews': 'data/processed/reviews_cleaned.csv',
     'app_info': 'data/raw/app_info.csv',
     'sentiment_results': 'data/processed/reviews_with_sentiment.csv',
-    'theme_results': 'data/processed/reviews_with_themes.csv'
+    'theme_results': 'data/processed/reviews_with_themes.csv',
+    'theme_results_parquet': 'data/processed/reviews_with_themes.parquet',
+    'preprocessing_cache': 'data/cache/preprocessing',
+    'onnx_models': 'data/cache/onnx',
+    'scrape_cache': 'data/cache/scrape',
+    'tfidf_cache': 'data/cache/tfidf'
 }
 
 # =============================================================================
@@ -1,14 +1,12 @@
 -- Enhanced with explicit constraints and documentation
 -- File: database/database_setup.sql
 
--- Drop tables if they exist (for clean setup)
-DROP TABLE IF EXISTS reviews CASCADE;
-DROP TABLE IF EXISTS banks CASCADE;
+-- Idempotent setup: safe to re-run without dropping existing data
 
 -- ============================================================================
 -- 1. BANKS TABLE - Master table for bank information
 -- ============================================================================
-CREATE TABLE banks (
+CREATE TABLE IF NOT EXISTS banks (
     bank_id SERIAL PRIMARY KEY,
     bank_name VARCHAR(100) NOT NULL,
     app_name VARCHAR(100) NOT NULL,
@@ -26,7 +24,7 @@ COMMENT ON COLUMN banks.app_name IS 'Name of the mobile banking app';
 -- ============================================================================
 -- 2. REVIEWS TABLE - Stores processed review data from Task 2
 -- ============================================================================
-CREATE TABLE reviews (
+CREATE TABLE IF NOT EXISTS reviews (
     review_id VARCHAR(20) PRIMARY KEY, -- e.g., REVIEW_0001
     bank_id INTEGER NOT NULL,
     review_text TEXT NOT NULL,
@@ -52,11 +50,11 @@ COMMENT ON COLUMN reviews.sentiment_label IS 'Categorical sentiment (POSITIVE/NE
 -- ============================================================================
 -- 3. INDEXES FOR PERFORMANCE
 -- ============================================================================
-CREATE INDEX idx_reviews_bank_id ON reviews(bank_id);
-CREATE INDEX idx_reviews_rating ON reviews(rating);
-CREATE INDEX idx_reviews_date ON reviews(review_date);
-CREATE INDEX idx_reviews_sentiment ON reviews(sentiment_label, sentiment_score);
-CREATE INDEX idx_reviews_sentiment_score ON reviews(sentiment_score DESC);
+CREATE INDEX IF NOT EXISTS idx_reviews_bank_id ON reviews(bank_id);
+CREATE INDEX IF NOT EXISTS idx_reviews_rating ON reviews(rating);
+CREATE INDEX IF NOT EXISTS idx_reviews_date ON reviews(review_date);
+CREATE INDEX IF NOT EXISTS idx_reviews_sentiment ON reviews(sentiment_label, sentiment_score);
+CREATE INDEX IF NOT EXISTS idx_reviews_sentiment_score ON reviews(sentiment_score DESC);
 
 -- ============================================================================
 -- 4. SAMPLE DATA INSERTION (for verification)
@@ -65,6 +63,7 @@ CREATE INDEX idx_reviews_sentiment_score ON reviews(sentiment_score DESC);
 INSERT INTO banks (bank_name, app_name) VALUES
 ('Commercial Bank of Ethiopia', 'Commercial Bank of Ethiopia Mobile'),
 ('Bank of Abyssinia', 'BoA Mobile'),
-('Dashen Bank', 'Dashen Mobile');
+('Dashen Bank', 'Dashen Mobile')
+ON CONFLICT (bank_name, app_name) DO NOTHING;
 
 -- Note: The actual review data will be inserted via Python script
\ No newline at end of file
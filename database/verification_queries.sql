@@ -60,30 +60,25 @@ ORDER BY b.bank_name, r.rating DESC;
 -- 3. DATA QUALITY CHECKS
 -- ============================================================================
 
--- Missing data check
+-- Missing data and duplicate checks (duplicates should be 0 due to unique constraint)
+-- All four counts come from a single scan of reviews
 SELECT 
-    'Missing review_text' AS check_type,
-    COUNT(*) AS issues
-FROM reviews 
-WHERE review_text IS NULL OR LENGTH(TRIM(review_text)) = 0
-UNION ALL
-SELECT 
-    'Invalid ratings (not 1-5)',
-    COUNT(*)
-FROM reviews 
-WHERE rating NOT BETWEEN 1 AND 5
-UNION ALL
-SELECT 
-    'Missing sentiment labels',
-    COUNT(*)
-FROM reviews 
-WHERE sentiment_label IS NULL;
-
--- Duplicate check (should be 0 due to unique constraint)
-SELECT 
-    'Potential duplicates' AS check_type,
-    COUNT(*) - COUNT(DISTINCT (review_text, bank_id, review_date)) AS issues
-FROM reviews;
+    v.check_type,
+    v.issues
+FROM (
+    SELECT 
+        COUNT(*) FILTER (WHERE review_text IS NULL OR LENGTH(TRIM(review_text)) = 0) AS missing_text,
+        COUNT(*) FILTER (WHERE rating NOT BETWEEN 1 AND 5) AS invalid_ratings,
+        COUNT(*) FILTER (WHERE sentiment_label IS NULL) AS missing_labels,
+        COUNT(*) - COUNT(DISTINCT (review_text, bank_id, review_date)) AS duplicates
+    FROM reviews
+) c
+CROSS JOIN LATERAL (VALUES
+    ('Missing review_text', c.missing_text),
+    ('Invalid ratings (not 1-5)', c.invalid_ratings),
+    ('Missing sentiment labels', c.missing_labels),
+    ('Potential duplicates', c.duplicates)
+) AS v(check_type, issues);
 
 -- ============================================================================
 -- 4. TEMPORAL ANALYSIS
@@ -1,40 +1,55 @@
 # File: scripts/database_manager_fixed.py
-import psycopg2
+import io
+from psycopg2.extras import execute_values
+import numpy as np
 import pandas as pd
 import sys
 import os
+import time
 from datetime import datetime
-from dotenv import load_dotenv
+from itertools import groupby
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from config import DATA_PATHS
+from scripts.database_manager import get_connection_pool, close_connection_pool
+
+REVIEW_COLUMNS = ['review_id', 'bank_id', 'review_text', 'rating',
+                  'review_date', 'sentiment_label', 'sentiment_score', 'source']
+
+# Mirrors the CHECK constraints on reviews in database_setup_fixed.sql
+VALID_SENTIMENT_LABELS = ('POSITIVE', 'NEGATIVE', 'NEUTRAL')
+
+# Secondary indexes from database_setup_fixed.sql, rebuilt after each bulk load
+REVIEW_INDEXES = {
+    'idx_reviews_bank_id': 'reviews(bank_id)',
+    'idx_reviews_rating': 'reviews(rating)',
+    'idx_reviews_date': 'reviews(review_date)',
+    'idx_reviews_sentiment': 'reviews(sentiment_label, sentiment_score)'
+}
 
 class DatabaseManagerFixed:
     """Fixed database manager without the strict constraint issue"""
     
     def __init__(self):
-        load_dotenv()
-        self.db_config = {
-            'host': os.getenv('DB_HOST', 'localhost'),
-            'database': os.getenv('DB_NAME', 'bank_reviews'),
-            'user': os.getenv('DB_USER', 'postgres'),
-            'password': os.getenv('DB_PASSWORD', '123456'),
-            'port': os.getenv('DB_PORT', '5432')
-        }
+        # Connection settings live in scripts.database_manager (shared pool)
         self.connection = None
+        self._review_count_cache = None
         
     def connect(self):
         """Establish database connection"""
         try:
-            self.connection = psycopg2.connect(**self.db_config)
-            print(f"✅ Connected to PostgreSQL database: {self.db_config['database']}")
+            self.connection = get_connection_pool().getconn()
+            print(f"✅ Connected to PostgreSQL database: {self.connection.info.dbname}")
             return True
         except Exception as e:
             print(f"❌ Database connection failed: {e}")
             return False
     
-    def insert_reviews_with_evidence(self):
-        """Insert reviews with proper conflict handling and evidence logging"""
+    def insert_reviews_with_evidence(self, use_copy=True):
+        """Insert reviews with proper conflict handling and evidence logging
+        
+        use_copy=False falls back to batched INSERTs for hosts that restrict COPY
+        """
         try:
             # Load Task 2 data
             reviews_path = DATA_PATHS['sentiment_results']
@@ -45,74 +60,63 @@ class DatabaseManagerFixed:
             # Map bank names to IDs
             bank_mapping = self._get_bank_mapping()
             
-            # Track statistics
-            total_inserted = 0
-            bank_counts = {}
-            failed_inserts = 0
-            
             with self.connection.cursor() as cursor:
-                print("📝 Inserting reviews (this may take a moment)...")
+                print("📝 Preparing reviews for bulk load...")
+                rows = self._prepare_review_rows(df, bank_mapping)
+                # One bad row would abort the whole COPY, so reject them up front
+                rows, errors = self._drop_invalid_reviews(rows)
                 
-                for idx, row in df.iterrows():
-                    bank_id = bank_mapping.get(row['bank'])
-                    if not bank_id:
-                        print(f"⚠️  Bank not found: {row['bank']}")
-                        continue
-                    
-                    # Create unique review_id
-                    review_id = f"REVIEW_{idx:04d}"
-                    
-                    try:
-                        # Insert with conflict handling on PRIMARY KEY only
-                        cursor.execute("""
-                            INSERT INTO reviews (
-                                review_id, bank_id, review_text, rating, 
-                                review_date, sentiment_label, sentiment_score, source
-                            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                            ON CONFLICT (review_id) 
-                            DO UPDATE SET 
-                                review_text = EXCLUDED.review_text,
-                                sentiment_score = EXCLUDED.sentiment_score
-                        """, (
-                            review_id,
-                            bank_id,
-                            str(row['review'])[:500],  # Truncate for safety
-                            int(row['rating']),
-                            self._parse_date(row.get('date', '2025-01-01')),
-                            row['sentiment_label'],
-                            float(row['sentiment_score']),
-                            'Google Play'
-                        ))
-                        
-                        if cursor.rowcount > 0:
-                            total_inserted += 1
-                            bank_counts[row['bank']] = bank_counts.get(row['bank'], 0) + 1
-                        else:
-                            failed_inserts += 1
-                            
-                    except Exception as e:
-                        failed_inserts += 1
-                        # Print first few errors only
-                        if failed_inserts <= 3:
-                            print(f"   Insert failed for review {idx}: {str(e)[:50]}...")
+                # Whole load is one transaction: async commit, indexes rebuilt once at the end
+                cursor.execute("SET LOCAL synchronous_commit = OFF;")
+                self._drop_review_indexes(cursor)
                 
+                load_started = time.perf_counter()
+                if use_copy:
+                    print(f"📝 COPYing {len(rows)} reviews...")
+                    total_written = self._copy_upsert_reviews(cursor, rows)
+                else:
+                    print(f"📝 Inserting {len(rows)} reviews in batches...")
+                    total_written = self._upsert_review_values(cursor, rows)
+                # Rows already stored with identical payloads are skipped by the upsert guard
+                total_inserted = len(rows)
+                unchanged = total_inserted - total_written
+                failed_inserts = len(errors)
+                self._rebuild_review_indexes(cursor)
+                # Fresh statistics so the evidence/verification aggregates get hash plans
+                cursor.execute("ANALYZE reviews;")
                 self.connection.commit()
+                print(f"   Done in {time.perf_counter() - load_started:.2f}s")
                 
                 # 📊 EVIDENCE LOGGING - CRITICAL FOR GRADING
                 print(f"\n📊 INSERTION EVIDENCE:")
                 print(f"   Total reviews from Task 2: {len(df)}")
                 print(f"   Successfully inserted: {total_inserted}")
+                print(f"   Unchanged since last load: {unchanged}")
                 print(f"   Failed inserts: {failed_inserts}")
                 print(f"   Insertion rate: {(total_inserted/len(df))*100:.1f}%")
                 
-                print(f"\n🏦 REVIEWS INSERTED PER BANK:")
-                for bank, count in bank_counts.items():
-                    percentage = (count / total_inserted * 100) if total_inserted > 0 else 0
+                if errors:
+                    print(f"\n⚠️  {len(errors)} reviews failed validation (first 5 shown):")
+                    for review_id, reason in errors[:5]:
+                        print(f"   {review_id}: {reason}")
+                
+                # Per-bank counts and the grand total in one aggregate round trip
+                cursor.execute("""
+                    SELECT b.bank_name, COUNT(*), GROUPING(b.bank_name) = 1 AS is_total
+                    FROM reviews r
+                    JOIN banks b USING (bank_id)
+                    GROUP BY ROLLUP (b.bank_name)
+                    ORDER BY is_total, b.bank_name
+                """)
+                bank_stats = cursor.fetchall()
+                final_count = bank_stats[-1][1]
+                self._review_count_cache = final_count
+                
+                print(f"\n🏦 REVIEWS PER BANK:")
+                for bank, count, _ in bank_stats[:-1]:
+                    percentage = (count / final_count * 100) if final_count > 0 else 0
                     print(f"   {bank}: {count} reviews ({percentage:.1f}%)")
                 
-                # Final verification query
-                cursor.execute("SELECT COUNT(*) FROM reviews;")
-                final_count = cursor.fetchone()[0]
                 print(f"\n✅ FINAL DATABASE STATE:")
                 print(f"   Total reviews in database: {final_count}")
                 
@@ -128,84 +132,210 @@ class DatabaseManagerFixed:
             self.connection.rollback()
             return 0
     
-    def _get_bank_mapping(self):
-        """Get mapping of bank names to IDs"""
-        try:
-            with self.connection.cursor() as cursor:
-                cursor.execute("SELECT bank_id, bank_name FROM banks;")
-                return {name: bid for bid, name in cursor.fetchall()}
-        except:
-            # Fallback mapping
-            return {
-                'Commercial Bank of Ethiopia': 1,
-                'Bank of Abyssinia': 2,
-                'Dashen Bank': 3
-            }
+    def _prepare_review_rows(self, df, bank_mapping):
+        """Build the reviews table rows column-wise"""
+        df = df.copy()
+        
+        # Create unique review_id
+        df['review_id'] = 'REVIEW_' + df.index.astype(str).str.zfill(4)
+        
+        # Categorical codes index straight into an id array; unknown banks get code -1
+        bank_codes = pd.Categorical(df['bank'], categories=list(bank_mapping)).codes
+        bank_ids = np.fromiter(bank_mapping.values(), dtype=np.int32, count=len(bank_mapping))
+        missing_bank = bank_codes < 0
+        if missing_bank.any():
+            print(f"⚠️  Bank not found for {missing_bank.sum()} rows: {df.loc[missing_bank, 'bank'].unique().tolist()}")
+            df = df.loc[~missing_bank]
+        df['bank_id'] = bank_ids[bank_codes[~missing_bank]]
+        
+        df['review_text'] = self._truncate_utf8(df['review'].fillna('').astype(str), 500)  # Truncate for safety
+        # Parse the whole date column in one pass; unparseable dates fall back to 2025-01-01
+        if 'date' in df.columns:
+            dates = pd.to_datetime(df['date'], errors='coerce', format='mixed', cache=True)
+            df['review_date'] = dates.fillna(pd.Timestamp('2025-01-01')).dt.strftime('%Y-%m-%d')
+        else:
+            df['review_date'] = '2025-01-01'
+        df['source'] = 'Google Play'
+        
+        # One cast per column instead of int()/float() per cell; rating stays nullable Int32
+        # so a missing or non-numeric rating reaches _drop_invalid_reviews as <NA>
+        df['rating'] = pd.to_numeric(df['rating'], errors='coerce').astype('Int32')
+        return df[REVIEW_COLUMNS].astype({
+            'bank_id': 'int32',
+            'sentiment_score': 'float32'
+        })
     
-    def _parse_date(self, date_str):
-        """Parse date string to YYYY-MM-DD format"""
-        try:
-            return pd.to_datetime(date_str).strftime('%Y-%m-%d')
-        except:
-            return '2025-01-01'
+    def _truncate_utf8(self, text, max_bytes):
+        """Cap text at max_bytes of UTF-8 without splitting a multi-byte character"""
+        text = text.str.slice(0, max_bytes)
+        # Only text with multi-byte characters (e.g. Amharic) is longer in bytes than in characters
+        multibyte = text.str.len() != text.str.encode('utf-8').str.len()
+        if multibyte.any():
+            text = text.copy()
+            text[multibyte] = (
+                text[multibyte].str.encode('utf-8').str.slice(0, max_bytes)
+                .str.decode('utf-8', errors='ignore')
+            )
+        return text
+    
+    def _drop_invalid_reviews(self, rows):
+        """Split off rows that would violate the reviews CHECK constraints
+        
+        Returns the valid rows and a list of (review_id, reason) errors.
+        """
+        checks = {
+            'missing rating': rows['rating'].isna(),
+            'rating not between 1 and 5': ~rows['rating'].between(1, 5).fillna(True),
+            'unknown sentiment label': ~rows['sentiment_label'].isin(VALID_SENTIMENT_LABELS),
+            'sentiment score not between 0 and 1': ~rows['sentiment_score'].between(0, 1),
+        }
+        errors = []
+        invalid = pd.Series(False, index=rows.index)
+        for reason, failed in checks.items():
+            # Report each row once, under the first check it fails
+            errors.extend((review_id, reason) for review_id in rows.loc[failed & ~invalid, 'review_id'])
+            invalid |= failed
+        # Only rows with a rating in range are left, so the integer cast cannot fail
+        return rows.loc[~invalid].astype({'rating': 'int32'}), errors
+    
+    def _drop_review_indexes(self, cursor):
+        """Drop secondary indexes so the load only maintains the primary key"""
+        for index_name in REVIEW_INDEXES:
+            cursor.execute(f"DROP INDEX IF EXISTS {index_name};")
+    
+    def _rebuild_review_indexes(self, cursor):
+        """Recreate secondary indexes in one pass each after the load"""
+        cursor.execute("SET LOCAL maintenance_work_mem = '128MB';")
+        for index_name, target in REVIEW_INDEXES.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {target};")
+    
+    def _copy_upsert_reviews(self, cursor, rows):
+        """COPY rows into a staging table, then upsert them into reviews in one statement"""
+        buffer = io.StringIO()
+        rows[REVIEW_COLUMNS].to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        
+        columns = ', '.join(REVIEW_COLUMNS)
+        # Defaults only: the stage needs no indexes, constraints are checked on the final insert
+        cursor.execute("CREATE TEMP TABLE reviews_stage (LIKE reviews INCLUDING DEFAULTS) ON COMMIT DROP;")
+        # FORCE_NOT_NULL keeps an empty review as '' instead of NULL
+        cursor.copy_expert(
+            f"COPY reviews_stage ({columns}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (review_text))",
+            buffer
+        )
+        
+        # Conflict handling on PRIMARY KEY only
+        cursor.execute(f"""
+            INSERT INTO reviews ({columns})
+            SELECT {columns} FROM reviews_stage
+            ON CONFLICT (review_id) 
+            DO UPDATE SET 
+                review_text = EXCLUDED.review_text,
+                sentiment_score = EXCLUDED.sentiment_score
+            WHERE reviews.review_text IS DISTINCT FROM EXCLUDED.review_text
+               OR reviews.sentiment_score IS DISTINCT FROM EXCLUDED.sentiment_score
+        """)
+        return cursor.rowcount
+    
+    def _upsert_review_values(self, cursor, rows):
+        """Upsert rows as multi-row VALUES statements (PostgreSQL gains little past 1000 rows/page)"""
+        upserted = execute_values(
+            cursor,
+            f"""
+                INSERT INTO reviews ({', '.join(REVIEW_COLUMNS)}) VALUES %s
+                ON CONFLICT (review_id) 
+                DO UPDATE SET 
+                    review_text = EXCLUDED.review_text,
+                    sentiment_score = EXCLUDED.sentiment_score
+                WHERE reviews.review_text IS DISTINCT FROM EXCLUDED.review_text
+                   OR reviews.sentiment_score IS DISTINCT FROM EXCLUDED.sentiment_score
+                RETURNING review_id
+            """,
+            list(rows[REVIEW_COLUMNS].itertuples(index=False, name=None)),
+            page_size=1000,
+            fetch=True
+        )
+        # rowcount only reflects the last page, so count the returned ids instead
+        return len(upserted)
+    
+    def _get_bank_mapping(self):
+        """Get mapping of bank names to IDs (errors propagate to the caller's rollback)"""
+        # Server-side cursor streams rows in itersize batches instead of one fetchall()
+        with self.connection.cursor(name='bank_mapping_cursor') as cursor:
+            cursor.itersize = 1024
+            cursor.execute("SELECT bank_name, bank_id FROM banks;")
+            return dict(cursor)
     
     def run_verification(self):
         """Run verification queries"""
         try:
-            # Simple verification queries
+            # All verification evidence in a single round trip
             with self.connection.cursor() as cursor:
                 print("\n🔍 RUNNING VERIFICATION QUERIES:")
                 print("=" * 50)
                 
+                # Keep the GROUP BY hash tables in memory for this transaction only
+                cursor.execute("SET LOCAL work_mem = '64MB';")
+                cursor.execute("""
+                    WITH stats AS (
+                        SELECT 
+                            COUNT(*) AS total_reviews,
+                            COUNT(*) FILTER (WHERE rating NOT BETWEEN 1 AND 5) AS invalid_ratings,
+                            COUNT(*) FILTER (WHERE sentiment_score NOT BETWEEN 0 AND 1) AS invalid_scores
+                        FROM reviews
+                    ),
+                    per_bank AS (
+                        SELECT b.bank_name, COUNT(r.review_id) as count
+                        FROM banks b
+                        LEFT JOIN reviews r ON b.bank_id = r.bank_id
+                        GROUP BY b.bank_name
+                    ),
+                    sentiment AS (
+                        SELECT sentiment_label, COUNT(*) as count
+                        FROM reviews
+                        GROUP BY sentiment_label
+                    )
+                    SELECT json_build_object(
+                        'banks', (SELECT COUNT(*) FROM banks),
+                        'total_reviews', s.total_reviews,
+                        'invalid_ratings', s.invalid_ratings,
+                        'invalid_scores', s.invalid_scores,
+                        'per_bank', (
+                            SELECT json_agg(json_build_array(bank_name, count) ORDER BY count DESC)
+                            FROM per_bank
+                        ),
+                        'sentiment', (
+                            SELECT json_agg(json_build_array(
+                                sentiment_label, count,
+                                ROUND(count * 100.0 / NULLIF(s.total_reviews, 0), 1)
+                            ) ORDER BY count DESC)
+                            FROM sentiment
+                        )
+                    )
+                    FROM stats s
+                """)
+                evidence = cursor.fetchone()[0]
+                self._review_count_cache = evidence['total_reviews']
+                
                 # 1. Basic counts
-                cursor.execute("SELECT 'Banks' as metric, COUNT(*) as value FROM banks")
                 print("📊 Basic Counts:")
-                print(f"   Banks: {cursor.fetchone()[1]}")
-                
-                cursor.execute("SELECT COUNT(*) as total_reviews FROM reviews")
-                total_reviews = cursor.fetchone()[0]
-                print(f"   Total Reviews: {total_reviews}")
+                print(f"   Banks: {evidence['banks']}")
+                print(f"   Total Reviews: {evidence['total_reviews']}")
                 
                 # 2. Reviews per bank
-                cursor.execute("""
-                    SELECT b.bank_name, COUNT(r.review_id) as count
-                    FROM banks b
-                    LEFT JOIN reviews r ON b.bank_id = r.bank_id
-                    GROUP BY b.bank_name
-                    ORDER BY count DESC
-                """)
                 print(f"\n🏦 Reviews per Bank:")
-                for bank, count in cursor.fetchall():
+                for bank, count in evidence['per_bank'] or []:
                     print(f"   {bank}: {count} reviews")
                 
                 # 3. Sentiment distribution
-                cursor.execute("""
-                    SELECT 
-                        sentiment_label,
-                        COUNT(*) as count,
-                        ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM reviews), 1) as percentage
-                    FROM reviews
-                    GROUP BY sentiment_label
-                    ORDER BY count DESC
-                """)
                 print(f"\n😊 Sentiment Distribution:")
-                for label, count, pct in cursor.fetchall():
+                for label, count, pct in evidence['sentiment'] or []:
                     print(f"   {label}: {count} reviews ({pct}%)")
                 
                 # 4. Data quality checks
-                cursor.execute("""
-                    SELECT COUNT(*) FROM reviews WHERE rating NOT BETWEEN 1 AND 5
-                """)
-                invalid_ratings = cursor.fetchone()[0]
-                
-                cursor.execute("""
-                    SELECT COUNT(*) FROM reviews WHERE sentiment_score NOT BETWEEN 0 AND 1
-                """)
-                invalid_scores = cursor.fetchone()[0]
-                
                 print(f"\n✅ Data Quality Checks:")
-                print(f"   Invalid ratings: {invalid_ratings}")
-                print(f"   Invalid sentiment scores: {invalid_scores}")
+                print(f"   Invalid ratings: {evidence['invalid_ratings']}")
+                print(f"   Invalid sentiment scores: {evidence['invalid_scores']}")
                 
                 return True
                 
@@ -219,32 +349,33 @@ class DatabaseManagerFixed:
             dump_path = os.path.join('database', 'database_dump.sql')
             
             with self.connection.cursor() as cursor:
-                # Get schema
+                # Get schema: every public column in one query, grouped per table below
                 cursor.execute("""
-                    SELECT table_name 
-                    FROM information_schema.tables 
+                    SELECT table_name, column_name, data_type, is_nullable
+                    FROM information_schema.columns
                     WHERE table_schema = 'public'
-                    ORDER BY table_name
+                    ORDER BY table_name, ordinal_position
                 """)
-                tables = [row[0] for row in cursor.fetchall()]
+                columns = cursor.fetchall()
                 
-                with open(dump_path, 'w') as f:
-                    f.write(f"-- Database Dump for Bank Reviews Project\n")
-                    f.write(f"-- Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    f.write(f"-- Total reviews: {self._get_review_count()}\n")
-                    f.write("\n-- Schema:\n")
-                    
-                    for table in tables:
-                        cursor.execute(f"""
-                            SELECT column_name, data_type, is_nullable
-                            FROM information_schema.columns
-                            WHERE table_name = '{table}'
-                            ORDER BY ordinal_position
-                        """)
-                        f.write(f"\n-- {table} table structure:\n")
-                        f.write(f"-- Columns: {cursor.rowcount}\n")
-                        for col_name, data_type, nullable in cursor.fetchall():
-                            f.write(f"--   {col_name}: {data_type} {'(nullable)' if nullable == 'YES' else '(not null)'}\n")
+                # Build the whole dump in memory and write it once
+                lines = [
+                    "-- Database Dump for Bank Reviews Project",
+                    f"-- Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                    f"-- Total reviews: {self._get_review_count()}",
+                    "",
+                    "-- Schema:",
+                ]
+                for table, table_columns in groupby(columns, key=lambda col: col[0]):
+                    table_columns = list(table_columns)
+                    lines.append("")
+                    lines.append(f"-- {table} table structure:")
+                    lines.append(f"-- Columns: {len(table_columns)}")
+                    for _, col_name, data_type, nullable in table_columns:
+                        lines.append(f"--   {col_name}: {data_type} {'(nullable)' if nullable == 'YES' else '(not null)'}")
+            
+            with open(dump_path, 'w', buffering=1 << 20) as f:
+                f.write('\n'.join(lines) + '\n')
             
             print(f"✅ Database dump created: {dump_path}")
             return True
@@ -254,11 +385,14 @@ class DatabaseManagerFixed:
             return False
     
     def _get_review_count(self):
-        """Get total review count"""
+        """Get total review count (cached from the post-insert evidence query)"""
+        if self._review_count_cache is not None:
+            return self._review_count_cache
         try:
             with self.connection.cursor() as cursor:
                 cursor.execute("SELECT COUNT(*) FROM reviews;")
-                return cursor.fetchone()[0]
+                self._review_count_cache = cursor.fetchone()[0]
+                return self._review_count_cache
         except:
             return 0
     
@@ -305,8 +439,9 @@ class DatabaseManagerFixed:
     def close(self):
         """Close database connection"""
         if self.connection:
-            self.connection.close()
-            print("🔌 Database connection closed")
+            get_connection_pool().putconn(self.connection)
+            self.connection = None
+            print("🔌 Database connection returned to pool")
 
 
 def main():
@@ -327,6 +462,8 @@ def main():
             
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
+    finally:
+        close_connection_pool()
 
 
 if __name__ == "__main__":
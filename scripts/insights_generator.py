@@ -4,57 +4,190 @@ Generates business insights, recommendations, and ethical considerations
 """
 
 import pandas as pd
-import psycopg2
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
 from dotenv import load_dotenv
-from collections import defaultdict
 import numpy as np
+from joblib import Parallel, delayed
+from sklearn.feature_extraction.text import CountVectorizer
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from scripts.database_manager import get_connection_pool, close_connection_pool
+
+try:
+    import pyarrow  # noqa: F401  (optional: multithreaded parsing of the COPY stream)
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import orjson  # optional: C-accelerated JSON encoding for the insights report
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Load environment variables
 load_dotenv()
 
+# Common stop words dropped from key-term counts
+KEY_TERM_STOP_WORDS = frozenset(['this', 'that', 'with', 'have', 'from', 'they', 'what', 'when',
+                                 'where', 'which', 'would', 'could', 'should', 'their', 'there'])
+
+# Stop words are rejected by a negative lookahead, so filtering happens inside
+# the regex engine rather than in a per-token Python pass after tokenizing
+KEY_TERM_TOKEN_PATTERN = (
+    r'\b(?!(?:' + '|'.join(sorted(KEY_TERM_STOP_WORDS)) + r')\b)[a-zA-Z]{4,}\b'
+)
+
+# Analysis frame dtypes: ratings fit in int8, scores in float32, labels as categories
+ANALYSIS_DTYPES = {
+    'bank_id': 'int32',
+    'rating': 'int8',
+    'sentiment_score': 'float32',
+    'sentiment_label': 'category',
+    'source': 'category',
+    'bank_name': 'category',
+}
+
+# Shared pool has maxconn=4 and the generator itself holds one connection
+CONCURRENT_QUERY_WORKERS = 3
+
+# Aggregates computed server-side; the ORDER BY is the performance ranking
+BANK_COMPARISON_SQL = """
+    SELECT 
+        b.bank_name,
+        COUNT(*) AS total_reviews,
+        ROUND(AVG(r.rating), 2)::float8 AS avg_rating,
+        ROUND(AVG((r.sentiment_label = 'POSITIVE')::int) * 100, 1)::float8 AS positive_sentiment_pct,
+        ROUND(AVG(r.sentiment_score), 3)::float8 AS avg_sentiment_score
+    FROM reviews r
+    JOIN banks b ON r.bank_id = b.bank_id
+    GROUP BY b.bank_name
+    ORDER BY avg_rating DESC, avg_sentiment_score DESC
+"""
+
+KEY_METRICS_SQL = """
+    SELECT 
+        COUNT(*) AS total_reviews,
+        AVG(r.rating)::float8 AS avg_rating,
+        AVG((r.sentiment_label = 'POSITIVE')::int)::float8 AS positive_share,
+        AVG((r.sentiment_label = 'NEGATIVE')::int)::float8 AS negative_share
+    FROM reviews r
+    JOIN banks b ON r.bank_id = b.bank_id
+"""
+
+# Below this many reviews, worker start-up costs more than the tokenizing saves
+PARALLEL_TERMS_MIN_REVIEWS = 50_000
+
+def _extract_key_terms(texts, n_terms=10):
+    """Extract key terms from review texts using simple frequency analysis
+    
+    Module-level so joblib workers can pickle it cheaply.
+    """
+    vectorizer = CountVectorizer(token_pattern=KEY_TERM_TOKEN_PATTERN, lowercase=True)
+    try:
+        term_matrix = vectorizer.fit_transform(texts.astype(str))
+    except ValueError:
+        # No terms left after tokenizing and stop-word removal
+        return []
+    
+    # Get most common terms
+    counts = np.asarray(term_matrix.sum(axis=0)).ravel()
+    terms = vectorizer.get_feature_names_out()
+    if len(counts) > n_terms:
+        # Partial selection: only terms reaching the n-th highest count are sorted
+        cutoff = np.partition(counts, len(counts) - n_terms)[len(counts) - n_terms]
+        candidates = np.flatnonzero(counts >= cutoff)
+    else:
+        candidates = np.arange(len(counts))
+    top = candidates[np.argsort(-counts[candidates], kind='stable')[:n_terms]]
+    return [(str(terms[i]), int(counts[i])) for i in top]
+
 class InsightsGenerator:
     """Generates comprehensive business insights from database analysis"""
     
     def __init__(self):
         self.connection = None
         self.insights_data = {}
+        self._bank_stats_cache = None
+        self._bank_codes = None
+        self._bank_names = None
+        self._is_pos = None
+        self._is_neg = None
+        self._sql_aggregates = None
         self.connect()
     
     def connect(self):
         """Establish database connection"""
         try:
-            self.connection = psycopg2.connect(
-                host=os.getenv('DB_HOST', 'localhost'),
-                database=os.getenv('DB_NAME', 'bank_reviews'),
-                user=os.getenv('DB_USER', 'postgres'),
-                password=os.getenv('DB_PASSWORD', '123456'),
-                port=os.getenv('DB_PORT', '5432')
-            )
+            self.connection = get_connection_pool().getconn()
             print(" Connected to database for insights generation!")
         except Exception as e:
             print(f" Database connection failed: {e}")
             raise
     
+    def _fetch_concurrently(self, queries):
+        """Run independent read queries at the same time, one pooled connection each
+        
+        A single connection cannot multiplex statements; psycopg2 releases the GIL
+        while waiting on the server, so threads overlap the round trips.
+        Returns the fetched rows in the same order as queries.
+        """
+        pool = get_connection_pool()
+        
+        def fetch(sql):
+            connection = pool.getconn()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(sql)
+                    return cursor.fetchall()
+            finally:
+                connection.rollback()
+                pool.putconn(connection)
+        
+        with ThreadPoolExecutor(max_workers=min(len(queries), CONCURRENT_QUERY_WORKERS)) as executor:
+            return list(executor.map(fetch, queries))
+    
+    def _load_sql_aggregates(self):
+        """Fetch the bank comparison and key metric aggregates concurrently, once"""
+        if self._sql_aggregates is None:
+            bank_rows, metric_rows = self._fetch_concurrently([BANK_COMPARISON_SQL, KEY_METRICS_SQL])
+            self._sql_aggregates = {'bank_comparison': bank_rows, 'key_metrics': metric_rows[0]}
+        return self._sql_aggregates
+    
     def load_analysis_data(self):
         """Load comprehensive data for insights generation"""
         try:
-            with self.connection.cursor() as cursor:
-                # Load reviews with sentiment and themes
-                cursor.execute("""
-                    SELECT r.*, b.bank_name, b.app_name 
-                    FROM reviews r 
-                    JOIN banks b ON r.bank_id = b.bank_id
-                    ORDER BY r.review_date DESC;
-                """)
-                reviews_data = cursor.fetchall()
+            with self.connection.cursor() as cursor, SpooledTemporaryFile(max_size=64 << 20) as buffer:
+                # Load reviews with sentiment and themes; COPY streams CSV, so rows never become Python tuples
+                cursor.copy_expert("""
+                    COPY (
+                        SELECT r.review_id, r.bank_id, r.review_text, r.rating, r.review_date,
+                               r.sentiment_label, r.sentiment_score, r.source,
+                               r.processed_at AS created_at, b.bank_name, b.app_name
+                        FROM reviews r 
+                        JOIN banks b ON r.bank_id = b.bank_id
+                        ORDER BY r.review_date DESC
+                    ) TO STDOUT WITH CSV HEADER
+                """, buffer)
+                buffer.seek(0)
+                
+                # Convert to DataFrame (column names come from the CSV header),
+                # parsing straight into compact dtypes to cut bytes per aggregation
+                self.df = pd.read_csv(buffer, parse_dates=['review_date', 'created_at'],
+                                      dtype=ANALYSIS_DTYPES,
+                                      engine='pyarrow' if PYARROW_AVAILABLE else 'c')
+                self._bank_stats_cache = None
+                self._sql_aggregates = None
+                
+                # Compare sentiment labels once; later stats reuse these boolean masks
+                self._is_pos = (self.df['sentiment_label'] == 'POSITIVE').to_numpy()
+                self._is_neg = (self.df['sentiment_label'] == 'NEGATIVE').to_numpy()
                 
-                # Convert to DataFrame
-                columns = ['review_id', 'bank_id', 'review_text', 'rating', 'review_date', 
-                          'sentiment_label', 'sentiment_score', 'source', 'created_at', 
-                          'bank_name', 'app_name']
-                self.df = pd.DataFrame(reviews_data, columns=columns)
+                # Factorize banks once; per-bank stats and distributions reuse the codes
+                self._bank_codes, self._bank_names = pd.factorize(self.df['bank_name'])
                 
                 print(f"📊 Loaded {len(self.df)} reviews for insights analysis")
                 return self.df
@@ -68,31 +201,31 @@ class InsightsGenerator:
         print("\n🎯 Identifying Drivers & Pain Points...")
         
         drivers_pain_points = {}
+        bank_stats = self._bank_stats()
+        key_terms = self._extract_all_key_terms(n_terms=10)
+        progress_lines = []
         
-        for bank in self.df['bank_name'].unique():
-            bank_data = self.df[self.df['bank_name'] == bank]
-            positive_reviews = bank_data[bank_data['sentiment_label'] == 'POSITIVE']
-            negative_reviews = bank_data[bank_data['sentiment_label'] == 'NEGATIVE']
-            
+        for bank, stats in bank_stats.items():
             bank_insights = {
                 'drivers': [],
                 'pain_points': [],
                 'stats': {
-                    'total_reviews': len(bank_data),
-                    'positive_count': len(positive_reviews),
-                    'negative_count': len(negative_reviews),
-                    'avg_rating': bank_data['rating'].mean(),
-                    'avg_sentiment': bank_data['sentiment_score'].mean()
+                    'total_reviews': stats['total_reviews'],
+                    'positive_count': stats['positive_count'],
+                    'negative_count': stats['negative_count'],
+                    'avg_rating': stats['avg_rating'],
+                    'avg_sentiment': stats['avg_sentiment']
                 }
             }
             
-            # Analyze positive reviews for drivers
-            positive_text = ' '.join(positive_reviews['review_text'].astype(str))
-            common_positive_terms = self._extract_key_terms(positive_text, n_terms=10)
-            
-            # Analyze negative reviews for pain points
-            negative_text = ' '.join(negative_reviews['review_text'].astype(str))
-            common_negative_terms = self._extract_key_terms(negative_text, n_terms=10)
+            # Positive reviews reveal drivers, negative ones pain points; the most
+            # frequent terms are kept in the report as evidence for both lists
+            common_positive_terms = key_terms.get((bank, 'POSITIVE'), [])
+            common_negative_terms = key_terms.get((bank, 'NEGATIVE'), [])
+            bank_insights['key_terms'] = {
+                'positive': common_positive_terms,
+                'negative': common_negative_terms
+            }
             
             # Bank-specific insights based on data patterns
             if bank == 'Commercial Bank of Ethiopia':
@@ -132,61 +265,73 @@ class InsightsGenerator:
                 ]
             
             drivers_pain_points[bank] = bank_insights
-            print(f"   {bank}: {len(bank_insights['drivers'])} drivers, {len(bank_insights['pain_points'])} pain points")
+            progress_lines.append(f"   {bank}: {len(bank_insights['drivers'])} drivers, {len(bank_insights['pain_points'])} pain points")
         
+        print("\n".join(progress_lines))
         self.insights_data['drivers_pain_points'] = drivers_pain_points
         return drivers_pain_points
     
-    def _extract_key_terms(self, text, n_terms=10):
-        """Extract key terms from text using simple frequency analysis"""
-        from collections import Counter
-        import re
-        
-        # Clean and tokenize text
-        words = re.findall(r'\b[a-zA-Z]{4,}\b', text.lower())
-        
-        # Remove common stop words
-        stop_words = {'this', 'that', 'with', 'have', 'from', 'they', 'what', 'when', 
-                     'where', 'which', 'would', 'could', 'should', 'their', 'there'}
-        filtered_words = [word for word in words if word not in stop_words]
-        
-        # Get most common terms
-        common_terms = Counter(filtered_words).most_common(n_terms)
-        return common_terms
+    def _bank_stats(self):
+        """Per-bank review statistics computed in a single groupby pass"""
+        if self._bank_stats_cache is None:
+            grouped = self.df.assign(is_pos=self._is_pos, is_neg=self._is_neg).groupby(self._bank_codes)
+            self._bank_stats_cache = grouped.agg(
+                total_reviews=('review_id', 'size'),
+                positive_count=('is_pos', 'sum'),
+                negative_count=('is_neg', 'sum'),
+                positive_share=('is_pos', 'mean'),
+                avg_rating=('rating', 'mean'),
+                avg_sentiment=('sentiment_score', 'mean')
+            ).set_axis(self._bank_names).to_dict('index')
+        return self._bank_stats_cache
+    
+    def _extract_all_key_terms(self, n_terms=10):
+        """Extract key terms for every (bank, sentiment) slice, in parallel for large datasets"""
+        slices = self.df[self._is_pos | self._is_neg]
+        tasks = [(key, group['review_text'])
+                 for key, group in slices.groupby(['bank_name', 'sentiment_label'], sort=False, observed=True)]
+        n_jobs = -1 if len(self.df) >= PARALLEL_TERMS_MIN_REVIEWS else 1
+        results = Parallel(n_jobs=n_jobs, backend='loky')(
+            delayed(_extract_key_terms)(texts, n_terms) for _, texts in tasks
+        )
+        return {key: terms for (key, _), terms in zip(tasks, results)}
     
     def generate_bank_comparison(self):
         """Generate comprehensive bank comparison insights"""
         print("\n🏦 Generating Bank Comparison Analysis...")
         
         comparison_data = {}
-        
-        for bank in self.df['bank_name'].unique():
-            bank_data = self.df[self.df['bank_name'] == bank]
-            
+        # Ratings are a small integer domain: count all banks in one bincount pass
+        n_banks = len(self._bank_names)
+        ratings = self.df['rating'].to_numpy(dtype=np.int64)
+        n_ratings = int(ratings.max()) + 1 if len(ratings) else 1
+        rating_dist = np.bincount(
+            self._bank_codes * n_ratings + ratings, minlength=n_banks * n_ratings
+        ).reshape(n_banks, n_ratings)
+        
+        # Rows arrive already ranked by performance (rating + sentiment)
+        bank_rows = self._load_sql_aggregates()['bank_comparison']
+        for rank, (bank, total, avg_rating, positive_pct, avg_sentiment) in enumerate(bank_rows, 1):
             comparison_data[bank] = {
-                'total_reviews': len(bank_data),
-                'avg_rating': round(bank_data['rating'].mean(), 2),
-                'positive_sentiment_pct': round((bank_data['sentiment_label'] == 'POSITIVE').mean() * 100, 1),
-                'avg_sentiment_score': round(bank_data['sentiment_score'].mean(), 3),
-                'rating_distribution': bank_data['rating'].value_counts().to_dict(),
-                'performance_rank': None
+                'total_reviews': total,
+                'avg_rating': avg_rating,
+                'positive_sentiment_pct': positive_pct,
+                'avg_sentiment_score': avg_sentiment,
+                'rating_distribution': {
+                    rating: int(count)
+                    for rating, count in enumerate(rating_dist[self._bank_names.get_loc(bank)]) if count
+                },
+                'performance_rank': rank
             }
-        
-        # Rank banks by performance (rating + sentiment)
-        ranked_banks = sorted(comparison_data.keys(), 
-                            key=lambda x: (comparison_data[x]['avg_rating'], 
-                                         comparison_data[x]['avg_sentiment_score']), 
-                            reverse=True)
-        
-        for i, bank in enumerate(ranked_banks, 1):
-            comparison_data[bank]['performance_rank'] = i
+        ranked_banks = list(comparison_data)
         
         self.insights_data['bank_comparison'] = comparison_data
         
-        print("   Bank Performance Ranking:")
+        ranking_lines = ["   Bank Performance Ranking:"]
         for i, bank in enumerate(ranked_banks, 1):
             stats = comparison_data[bank]
-            print(f"     {i}. {bank}: ⭐{stats['avg_rating']} | 😊{stats['positive_sentiment_pct']}% | Score: {stats['avg_sentiment_score']}")
+            ranking_lines.append(f"     {i}. {bank}: ⭐{stats['avg_rating']} | 😊{stats['positive_sentiment_pct']}% | Score: {stats['avg_sentiment_score']}")
+        print("\n".join(ranking_lines))
         
         return comparison_data
     
@@ -195,6 +340,7 @@ class InsightsGenerator:
         print("\n💡 Generating Strategic Recommendations...")
         
         recommendations = {}
+        progress_lines = []
         
         for bank, insights in self.insights_data['drivers_pain_points'].items():
             bank_recommendations = []
@@ -228,8 +374,9 @@ class InsightsGenerator:
                 'strategic_initiatives': bank_recommendations[2:]  # Longer-term
             }
             
-            print(f"   {bank}: {len(bank_recommendations)} recommendations generated")
+            progress_lines.append(f"   {bank}: {len(bank_recommendations)} recommendations generated")
         
+        print("\n".join(progress_lines))
         self.insights_data['recommendations'] = recommendations
         return recommendations
     
@@ -283,8 +430,8 @@ class InsightsGenerator:
     
     def _generate_executive_summary(self):
         """Generate executive summary of findings"""
-        top_bank = max(self.insights_data['bank_comparison'].items(), 
-                      key=lambda x: x[1]['avg_rating'])[0]
+        # bank_comparison is already ordered by rank, so the top performer is its first key
+        top_bank = next(iter(self.insights_data['bank_comparison']), None)
         
         total_complaints = sum(len(insights['pain_points']) 
                              for insights in self.insights_data['drivers_pain_points'].values())
@@ -292,37 +439,38 @@ class InsightsGenerator:
         return {
             'top_performer': top_bank,
             'total_reviews_analyzed': len(self.df),
-            'overall_positive_sentiment': round((self.df['sentiment_label'] == 'POSITIVE').mean() * 100, 1),
+            'overall_positive_sentiment': round(self._is_pos.mean() * 100, 1),
             'key_opportunities': total_complaints,
             'primary_improvement_areas': ['Transaction Reliability', 'User Authentication', 'App Performance']
         }
     
     def _calculate_key_metrics(self):
         """Calculate key business metrics"""
+        total_reviews, avg_rating, positive_share, negative_share = self._load_sql_aggregates()['key_metrics']
         return {
-            'customer_satisfaction_index': round(self.df['rating'].mean() * 20, 1),  # Convert to 0-100 scale
-            'sentiment_balance_ratio': round((self.df['sentiment_label'] == 'POSITIVE').mean() / 
-                                           (self.df['sentiment_label'] == 'NEGATIVE').mean(), 2),
-            'review_engagement_rate': round(len(self.df) / 1244 * 100, 1),  # Based on total possible
-            'improvement_priority_score': round((5 - self.df['rating'].mean()) * 20, 1)  # Higher = more need
+            'customer_satisfaction_index': round(avg_rating * 20, 1),  # Convert to 0-100 scale
+            'sentiment_balance_ratio': round(np.float64(positive_share) / negative_share, 2),
+            'review_engagement_rate': round(total_reviews / 1244 * 100, 1),  # Based on total possible
+            'improvement_priority_score': round((5 - avg_rating) * 20, 1)  # Higher = more need
         }
     
     def _print_report_summary(self, report):
         """Print a summary of the insights report"""
-        print("\n" + "="*60)
-        print("📊 TASK 4 - INSIGHTS REPORT SUMMARY")
-        print("="*60)
-        
+        # Build the whole summary first and write it with a single print
         exec_summary = report['executive_summary']
-        print(f"\n🏆 Top Performer: {exec_summary['top_performer']}")
-        print(f"📈 Overall Positive Sentiment: {exec_summary['overall_positive_sentiment']}%")
-        print(f"🎯 Key Improvement Opportunities: {exec_summary['key_opportunities']} identified")
-        
-        print(f"\n💡 Recommendations Summary:")
-        for bank, recs in report['recommendations'].items():
-            print(f"   {bank}: {len(recs['immediate_actions'])} immediate actions")
-        
-        print(f"\n⚖️ Ethical Considerations: {len(report['ethical_considerations']['potential_biases'])} biases identified")
+        lines = [
+            "\n" + "="*60,
+            "📊 TASK 4 - INSIGHTS REPORT SUMMARY",
+            "="*60,
+            f"\n🏆 Top Performer: {exec_summary['top_performer']}",
+            f"📈 Overall Positive Sentiment: {exec_summary['overall_positive_sentiment']}%",
+            f"🎯 Key Improvement Opportunities: {exec_summary['key_opportunities']} identified",
+            f"\n💡 Recommendations Summary:",
+        ]
+        lines.extend(f"   {bank}: {len(recs['immediate_actions'])} immediate actions"
+                     for bank, recs in report['recommendations'].items())
+        lines.append(f"\n⚖️ Ethical Considerations: {len(report['ethical_considerations']['potential_biases'])} biases identified")
+        print("\n".join(lines))
     
     def save_insights_report(self, report, filename='data/processed/task4_insights_report.json'):
         """Save insights report to JSON file"""
@@ -333,12 +481,18 @@ class InsightsGenerator:
         report['metadata'] = {
             'generated_at': datetime.now().isoformat(),
             'total_reviews': len(self.df),
-            'banks_analyzed': list(self.df['bank_name'].unique()),
+            'banks_analyzed': list(self._bank_names),
             'analysis_version': '1.0'
         }
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
+        if ORJSON_AVAILABLE:
+            # Handles numpy scalars and int dict keys (rating_distribution) natively
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2 |
+                                     orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
         
         print(f"💾 Insights report saved to: {filename}")
         return filename
@@ -346,8 +500,9 @@ class InsightsGenerator:
     def close(self):
         """Close database connection"""
         if self.connection:
-            self.connection.close()
-            print(" Database connection closed.")
+            get_connection_pool().putconn(self.connection)
+            self.connection = None
+            print(" Database connection returned to pool.")
 
 def main():
     """Main execution function for insights generation"""
@@ -387,6 +542,7 @@ def main():
     finally:
         if generator:
             generator.close()
+        close_connection_pool()
 
 if __name__ == "__main__":
     insights_report = main()
\ No newline at end of file
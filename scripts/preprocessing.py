@@ -8,6 +8,7 @@ import os
 import pandas as pd
 import numpy as np
 import re
+import html
 from datetime import datetime
 
 # Add parent directory to path for config import
@@ -15,12 +16,141 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from config import DATA_PATHS
 
+try:
+    import pyarrow  # noqa: F401  (optional: multithreaded CSV parsing and Arrow-backed strings)
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    from joblib import Memory  # optional: on-disk cache of the load/filter stage between runs
+    JOBLIB_AVAILABLE = True
+except ImportError:
+    JOBLIB_AVAILABLE = False
+
+# Raw scraper columns read by the pipeline (dedup keys, critical fields, filled fields)
+PIPELINE_COLUMNS = ['review_text', 'rating', 'review_date', 'user_name',
+                    'thumbs_up', 'app_version', 'bank_name', 'source']
+
+TEXT_COLUMNS = ['review_text', 'user_name', 'app_version']
+
+# Narrow nullable integers: ratings are 1-5 (signed so bad values still reach
+# validate_ratings), thumbs-up counts are small and non-negative
+NUMERIC_DTYPES = {'rating': 'Int8', 'thumbs_up': 'UInt32'}
+
+# Text-cleaning patterns, compiled once instead of per review
+WHITESPACE_RE = re.compile(r'\s+')
+REPEATED_EXCLAIM_RE = re.compile(r'[!?]{3,}')
+REPEATED_DOTS_RE = re.compile(r'\.{3,}')
+# Only complete (semicolon-terminated) entities: html.unescape alone also decodes
+# legacy prefixes such as '&not' in '&notification'
+HTML_ENTITY_RE = re.compile(r'&(?:#\d+|#[xX][0-9a-fA-F]+|[A-Za-z][A-Za-z0-9]*);')
+
+# RE2 spelling of Python's Unicode \s for Arrow's regex kernels, whose \s is ASCII-only
+ARROW_WHITESPACE_PATTERN = r'[\t-\r\x1c-\x1f\x{85}\pZ]+'
+
+# Specific garbage patterns seen in the scraped reviews
+GARBAGE_PATTERNS = [
+    # Pattern 1: Mixed Amharic garbage
+    r'^[áŒ¥áˆ©áŠá‹áŒáŠ•áˆ‹á‹­áŠ á‹µáˆ­áŒŽá‹«á‰†áˆáˆˆáŠ•áŒá‹µáˆµáˆ«]+$',
+    r'^[áŒ­áˆµáˆ˜áˆáŠ­áˆ«á‰½á‹áŠ¥áŠ“áŠ á‹­áŒˆáŠ“áŠáˆá¢á‰ áŒ£áˆá‹¨áˆšá‹«áˆµáŒ áˆ‹]+$',
+    r'^[áŠ áˆªá‹áŠá‹‰áŠáŒˆáˆ­áŒáŠ•á‰ áŒ£áˆá‹¨á‰†á‹¨á‹‰áŠ•á‹¨áˆšá‹«áˆ³á‹­]+$',
+    r'maaliif daddafee install gaafata',
+    r'Nuuroo usmaan gaamilcom',
+
+    # Pattern 2: Emoji-only or excessive emoji
+    r'^[ðŸ‘ŒðŸ˜˜ðŸ‘ðŸ˜ŠðŸ¥°\U0001F600-\U0001F64F]+$',
+    r'^[âœŒï¸â™¥ï¸ðŸ˜¡ðŸ‡ªðŸ‡¹]+$',
+
+    # Pattern 3: Symbol/number garbage
+    r'^[z,MKT 20_\.!_!8+\+\â…"â…•]+$',
+    r'^[0-9\s\.\_\!\+]+$',
+
+    # Pattern 4: Specific Amharic garbage patterns you provided
+    r'á‰ áŒ£áˆ áŠ áˆªá! áŠ¨á‰€á‹µáˆžá‹',
+    r'áˆˆ áŠ•áŒá‹µ áˆµáˆ«áˆˆ áŠ•áŒá‹µ áˆµáˆ«',
+    r'áˆáŒ£áŠ• áŠ¥áŠ“ áˆáˆ­áŒ¥ á‰£áŠ•áŠ­ áŠá‹',
+    r'Ø§Ù„Ø³Ù„Ø§Ù… Ø¹Ù„ÙŠÙƒÙ… ÙˆØ±Ø­Ù…Ø© Ø§Ù„Ù„Ù‡ ÙˆØ¨Ø±ÙƒØ§ØªÙ‡',
+
+    # Pattern 5: Mixed garbage with angle brackets
+    r'^<>.+$',
+
+    # Pattern 5: Very short or repetitive
+    r'^.{0,2}$',  # 0-2 characters
+    r'^(?:\w\W*){1,3}$',  # 1-3 words with symbols
+]
+
+def _unescape_entities(text):
+    """Decode complete HTML entities (&amp;, &quot;, &#39;, ...) in one pass"""
+    return HTML_ENTITY_RE.sub(lambda match: html.unescape(match.group(0)), text)
+
+
+def _is_literal_pattern(pattern):
+    """True if a pattern has no regex metacharacters, i.e. is a plain substring"""
+    return not set(pattern) & set('.^$*+?{}[]\\|()')
+
+
+# Language-filter patterns, fused and compiled once. Anchored garbage patterns
+# are only tried at the start of a review (re.match) instead of at every offset;
+# literal phrases skip the regex engine and are found as lowercased substrings;
+# a review is garbage if any of them matches, as with any single pattern
+GARBAGE_ANCHORED_RE = re.compile(
+    '|'.join(f'(?:{pattern})' for pattern in GARBAGE_PATTERNS if pattern.startswith('^')),
+    re.IGNORECASE
+)
+GARBAGE_LITERALS = [pattern.lower() for pattern in GARBAGE_PATTERNS
+                    if not pattern.startswith('^') and _is_literal_pattern(pattern)]
+_garbage_search = [pattern for pattern in GARBAGE_PATTERNS
+                   if not pattern.startswith('^') and not _is_literal_pattern(pattern)]
+GARBAGE_SEARCH_RE = (re.compile('|'.join(f'(?:{pattern})' for pattern in _garbage_search), re.IGNORECASE)
+                     if _garbage_search else None)
+ENGLISH_WORD_RE = re.compile(r'\b[a-zA-Z]{3,}\b')
+WORD_RE = re.compile(r'\b\w+\b')
+
+# Codepoint ranges for the pure range checks (no regex needed)
+AMHARIC_RANGES = [(0x1200, 0x137F)]
+# Emoji planes: pictographs/emoticons/transport/supplemental symbols, flags
+# (regional indicators), misc symbols and dingbats, plus the ZWJ and
+# variation selector that join multi-codepoint emoji
+EMOJI_RANGES = [(0x1F300, 0x1FAFF), (0x1F1E6, 0x1F1FF), (0x2600, 0x27BF),
+                (0x200D, 0x200D), (0xFE0F, 0xFE0F)]
+
+
+def _count_codepoints_in_ranges(texts, lengths, *range_sets):
+    """Count, per text, the codepoints falling in each set of inclusive ranges
+    
+    All texts are encoded once into a flat UTF-32 array. Only codepoints at or
+    above the lowest range bound (few, in mostly-English reviews) are range
+    tested, then binned back to their text. Returns one count array per range set.
+    """
+    joined = ''.join(texts)
+    try:
+        encoded = joined.encode('utf-32-le')
+    except UnicodeEncodeError:  # lone surrogates from malformed scraped text
+        encoded = joined.encode('utf-32-le', 'surrogatepass')
+    codepoints = np.frombuffer(encoded, dtype=np.uint32)
+    
+    lowest = min(low for ranges in range_sets for low, _ in ranges)
+    positions = np.flatnonzero(codepoints >= lowest)
+    candidates = codepoints[positions]
+    text_ids = np.searchsorted(np.cumsum(lengths), positions, side='right')
+    
+    counts = []
+    for ranges in range_sets:
+        in_range = np.zeros(len(candidates), dtype=bool)
+        for low, high in ranges:
+            in_range |= (candidates >= low) & (candidates <= high)
+        counts.append(np.bincount(text_ids[in_range], minlength=len(lengths)))
+    return counts
+
 
 class ReviewPreprocessor:
     """Enhanced preprocessor with smart Amharic/Arabic filtering"""
     
     def __init__(self):
         self.input_path = DATA_PATHS['raw_reviews']
+        self.input_parquet_path = DATA_PATHS['raw_reviews_parquet']
         self.output_path = DATA_PATHS['processed_reviews']
         self.df = None
         self.stats = {
@@ -32,72 +162,120 @@ class ReviewPreprocessor:
             'final_count': 0
         }
     
+    def _current_raw_parquet(self):
+        """Return the raw-reviews Parquet path if it can be read and is not older than the CSV"""
+        if not PYARROW_AVAILABLE or not os.path.exists(self.input_parquet_path):
+            return None
+        if (os.path.exists(self.input_path)
+                and os.path.getmtime(self.input_parquet_path) < os.path.getmtime(self.input_path)):
+            return None  # CSV was rewritten after the Parquet copy (e.g. scraped without pyarrow)
+        return self.input_parquet_path
+    
     def load_data(self):
         """Load raw reviews data"""
         print("📥 Loading raw data...")
         try:
-            self.df = pd.read_csv(self.input_path)
+            parquet_path = self._current_raw_parquet()
+            if parquet_path:
+                # Typed columnar copy from the scraper: no CSV parsing, same projection
+                columns = [col for col in pq.read_schema(parquet_path).names if col in PIPELINE_COLUMNS]
+                self.df = pd.read_parquet(parquet_path, columns=columns, dtype_backend='pyarrow')
+                self.df = self.df.astype({col: dt for col, dt in NUMERIC_DTYPES.items() if col in columns})
+            else:
+                # Parse only the columns the pipeline uses; the rest are never materialized
+                header = pd.read_csv(self.input_path, nrows=0).columns
+                usecols = [col for col in header if col in PIPELINE_COLUMNS]
+                dtype = {col: dt for col, dt in NUMERIC_DTYPES.items() if col in usecols}
+                if PYARROW_AVAILABLE:
+                    self.df = pd.read_csv(self.input_path, usecols=usecols, dtype=dtype,
+                                          engine='pyarrow', dtype_backend='pyarrow')
+                else:
+                    self.df = pd.read_csv(self.input_path, usecols=usecols, dtype=dtype)
+            
+            if PYARROW_AVAILABLE:
+                # Pin free-text columns to Arrow strings so every str.* call runs as an
+                # Arrow kernel (and all-numeric/all-null columns still accept text fills)
+                for col in TEXT_COLUMNS:
+                    if col in self.df.columns:
+                        self.df[col] = self.df[col].astype('string[pyarrow]')
             self.stats['original_count'] = len(self.df)
             print(f" Loaded {len(self.df)} raw reviews")
             
             # Show initial data overview
             print(f"   Columns: {list(self.df.columns)}")
             print(f"   Banks: {self.df['bank_name'].unique()}")
+            
+            # Few distinct values: store as dictionary-encoded categories
+            for col in ('bank_name', 'source'):
+                if col in self.df.columns:
+                    self.df[col] = self.df[col].astype('category')
             return True
             
         except Exception as e:
             print(f"❌ Failed to load data: {e}")
             return False
     
+    def load_and_filter(self):
+        """
+        Load, deduplicate, drop missing data and filter/clean/validate reviews.
+        The result is cached on disk keyed by the input files' and this module's
+        modification times, so unchanged re-runs skip regex scans entirely.
+        """
+        cache_key = tuple(os.path.getmtime(path) if os.path.exists(path) else None
+                          for path in (self.input_path, self.input_parquet_path, __file__))
+        load_and_filter = _load_and_filter_impl
+        if JOBLIB_AVAILABLE:
+            memory = Memory(DATA_PATHS['preprocessing_cache'], verbose=0)
+            load_and_filter = memory.cache(_load_and_filter_impl)
+            if load_and_filter.check_call_in_cache(self.input_path, self.input_parquet_path, cache_key):
+                print(f"♻️ Reusing cached filtered reviews from {DATA_PATHS['preprocessing_cache']}")
+        
+        self.df, self.stats = load_and_filter(self.input_path, self.input_parquet_path, cache_key)
+        if self.df is None:
+            if JOBLIB_AVAILABLE:
+                load_and_filter.clear(warn=False)  # never keep a failed load
+            return False
+        return True
+    
     def remove_duplicates_comprehensive(self):
         """Remove duplicates using multiple criteria"""
         print("\n🧹 Removing duplicates...")
         
         before = len(self.df)
         
-        # Strategy 1: Exact duplicates on multiple fields
-        self.df = self.df.drop_duplicates(
-            subset=['review_text', 'review_date', 'user_name'], 
-            keep='first'
+        # Strategy 1: Exact duplicates on multiple fields, compared via one
+        # vectorized 64-bit row hash instead of per-row Python tuples
+        row_keys = pd.util.hash_pandas_object(
+            self.df[['review_text', 'review_date', 'user_name']], index=False
         )
+        self.df = self.df[~row_keys.duplicated(keep='first').to_numpy()]
         
         removed = before - len(self.df)
         self.stats['duplicates_removed'] = removed
         print(f" Removed {removed} duplicate reviews")
     
-    def _text_similarity(self, text1, text2):
-        """Calculate simple text similarity ratio"""
-        words1 = set(text1.split())
-        words2 = set(text2.split())
-        
-        if not words1 or not words2:
-            return 0
-            
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        
-        return len(intersection) / len(union)
-    
     def handle_missing_values(self):
         """Handle missing values intelligently"""
         print("\n Handling missing values...")
         
         before = len(self.df)
         
-        # Check missing values
-        missing_data = self.df.isnull().sum()
+        # Check missing values (one isna pass feeds both the report and the row mask)
+        is_missing = self.df.isna()
+        missing_data = is_missing.sum()
         print("Missing values per column:")
         for col, count in missing_data.items():
             if count > 0:
-                pct = (count / len(self.df)) * 100
+                pct = (count / before) * 100
                 print(f"   {col}: {count} ({pct:.1f}%)")
         
-        # Remove rows with critical missing data
+        # Remove rows with critical missing data and empty reviews, slicing the frame once.
+        # strip() rather than a \S regex: Arrow's RE2 \s is ASCII-only, so NBSP-only
+        # reviews would count as non-empty there
         critical_cols = ['review_text', 'rating', 'review_date', 'bank_name']
-        self.df = self.df.dropna(subset=critical_cols)
-        
-        # Remove empty reviews
-        self.df = self.df[self.df['review_text'].str.strip() != '']
+        keep = (~is_missing[critical_cols].any(axis=1).to_numpy()
+                & self.df['review_text'].str.strip().str.len().gt(0).to_numpy(dtype=bool, na_value=False))
+        self.df = self.df[keep]
         
         # Fill non-critical missing values
         self.df['user_name'] = self.df['user_name'].fillna('Anonymous')
@@ -108,188 +286,169 @@ class ReviewPreprocessor:
         self.stats['missing_removed'] = removed
         print(f" Removed {removed} reviews with missing critical data")
     
-    def smart_language_filter(self):  # FIXED: Proper indentation
+    def _language_filter_mask(self, review_text):
         """
-        Enhanced filtering for the specific garbage patterns in your data
+        Enhanced filtering for the specific garbage patterns in your data.
+        Returns the keep mask and the per-category removal counts.
         """
-        print("\n🌍 Applying targeted language filtering...")
-        
-        before_count = len(self.df)
-        keep_mask = []
-        
-        # SPECIFIC GARBAGE PATTERNS FROM YOUR EXAMPLES
-        garbage_patterns = [
-        # Pattern 1: Mixed Amharic garbage
-        r'^[áŒ¥áˆ©áŠá‹áŒáŠ•áˆ‹á‹­áŠ á‹µáˆ­áŒŽá‹«á‰†áˆáˆˆáŠ•áŒá‹µáˆµáˆ«]+$',
-        r'^[áŒ­áˆµáˆ˜áˆáŠ­áˆ«á‰½á‹áŠ¥áŠ“áŠ á‹­áŒˆáŠ“áŠáˆá¢á‰ áŒ£áˆá‹¨áˆšá‹«áˆµáŒ áˆ‹]+$',
-        r'^[áŠ áˆªá‹áŠá‹‰áŠáŒˆáˆ­áŒáŠ•á‰ áŒ£áˆá‹¨á‰†á‹¨á‹‰áŠ•á‹¨áˆšá‹«áˆ³á‹­]+$',
-        r'maaliif daddafee install gaafata',
-        r'Nuuroo usmaan gaamilcom',
-        
-        # Pattern 2: Emoji-only or excessive emoji
-        r'^[ðŸ‘ŒðŸ˜˜ðŸ‘ðŸ˜ŠðŸ¥°\U0001F600-\U0001F64F]+$',
-        r'^[âœŒï¸â™¥ï¸ðŸ˜¡ðŸ‡ªðŸ‡¹]+$',
-        
-        # Pattern 3: Symbol/number garbage
-        r'^[z,MKT 20_\.!_!8+\+\â…"â…•]+$',
-        r'^[0-9\s\.\_\!\+]+$',
-        
-        
-        # Pattern 4: Specific Amharic garbage patterns you provided
-        r'á‰ áŒ£áˆ áŠ áˆªá! áŠ¨á‰€á‹µáˆžá‹',
-        r'áˆˆ áŠ•áŒá‹µ áˆµáˆ«áˆˆ áŠ•áŒá‹µ áˆµáˆ«',
-        r'áˆáŒ£áŠ• áŠ¥áŠ“ áˆáˆ­áŒ¥ á‰£áŠ•áŠ­ áŠá‹',
-        r'Ø§Ù„Ø³Ù„Ø§Ù… Ø¹Ù„ÙŠÙƒÙ… ÙˆØ±Ø­Ù…Ø© Ø§Ù„Ù„Ù‡ ÙˆØ¨Ø±ÙƒØ§ØªÙ‡',
-            
-            # Pattern 5: Mixed garbage with angle brackets
-            r'^<>.+$',
-            
-            # Pattern 5: Very short or repetitive
-            r'^.{0,2}$',  # 0-2 characters
-            r'^(\w\W*){1,3}$',  # 1-3 words with symbols
-        ]
+        # Vectorized checks over the whole column. Each category only counts reviews
+        # not already removed by an earlier one (short -> garbage -> amharic-only ->
+        # single word -> emoji-only), matching the original per-row order.
+        # Object dtype keeps Python's re semantics (Unicode \b, \U escapes).
+        text = review_text.astype(object).str.strip()
+        lengths = text.str.len().to_numpy(dtype=np.int64)
+        amharic_chars, emoji_chars = _count_codepoints_in_ranges(
+            text, lengths, AMHARIC_RANGES, EMOJI_RANGES
+        )
         
-        # Amharic Unicode range for detection
-        amharic_range = r'[\u1200-\u137F]'
+        # Skip empty or very short
+        short = lengths < 3
+        kept = ~short
+        
+        # Check for specific garbage patterns
+        is_garbage = text.str.match(GARBAGE_ANCHORED_RE).to_numpy(dtype=bool, copy=True)
+        lowered = text.str.lower()
+        for literal in GARBAGE_LITERALS:
+            is_garbage |= lowered.str.contains(literal, regex=False).to_numpy(dtype=bool)
+        if GARBAGE_SEARCH_RE is not None:
+            is_garbage |= text.str.contains(GARBAGE_SEARCH_RE, regex=True).to_numpy(dtype=bool)
+        garbage = kept & is_garbage
+        kept &= ~garbage
+        
+        # Check for Amharic-only content (no English)
+        amharic_only = (kept & (amharic_chars > 0)
+                        & ~text.str.contains(ENGLISH_WORD_RE, regex=True).to_numpy(dtype=bool))
+        kept &= ~amharic_only
+        
+        # Check for single word reviews without context; words are only counted for
+        # the few remaining short reviews instead of tokenizing the whole column
+        single_word = kept & (lengths < 4)
+        candidates = np.flatnonzero(single_word)
+        if len(candidates):
+            single_word[candidates] = text.iloc[candidates].str.count(WORD_RE).to_numpy() <= 1
+        kept &= ~single_word
+        
+        # Check for emoji-only reviews (every character an emoji or a space)
+        spaces = text.str.count(' ').to_numpy()
+        emoji_only = kept & (emoji_chars > 0) & (emoji_chars + spaces == lengths)
+        kept &= ~emoji_only
         
         removed_categories = {
-            'short': 0,
-            'garbage': 0,
-            'amharic_only': 0,
-            'single_word': 0,
-            'emoji_only': 0
+            'short': int(short.sum()),
+            'garbage': int(garbage.sum()),
+            'amharic_only': int(amharic_only.sum()),
+            'single_word': int(single_word.sum()),
+            'emoji_only': int(emoji_only.sum())
         }
-        
-        for idx, row in self.df.iterrows():
-            review_text = str(row['review_text']).strip()
-            
-            # Skip empty or very short
-            if len(review_text) < 3:
-                keep_mask.append(False)
-                removed_categories['short'] += 1
-                continue
-            
-            # Check for specific garbage patterns
-            is_garbage = any(re.search(pattern, review_text, re.IGNORECASE) 
-                           for pattern in garbage_patterns)
-            if is_garbage:
-                keep_mask.append(False)
-                removed_categories['garbage'] += 1
-                continue
-            
-            # Check for Amharic-only content (no English)
-            has_amharic = re.search(amharic_range, review_text)
-            english_words = len(re.findall(r'\b[a-zA-Z]{3,}\b', review_text))
+        return kept, removed_categories
+    
+    def _clean_review_text(self, review_text):
+        """Clean review text while preserving meaning"""
+        def clean_single_text(text):
+            if not text:
+                return ""
             
-            if has_amharic and english_words == 0:
-                keep_mask.append(False)
-                removed_categories['amharic_only'] += 1
-                continue
+            # Decode HTML entities (&amp;, &quot;, &#39;, ...) in one pass; a no-op without '&'
+            text = _unescape_entities(text)
             
-            # Check for single word reviews without context
-            words = re.findall(r'\b\w+\b', review_text)
-            if len(words) <= 1 and len(review_text) < 4:
-                keep_mask.append(False)
-                removed_categories['single_word'] += 1
-                continue
+            # Replace multiple spaces/tabs/newlines with single space (edges stripped at the end)
+            text = WHITESPACE_RE.sub(' ', text)
             
-            # Check for emoji-only reviews
-            emoji_only = re.match(r'^[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF]+$', review_text)
-            if emoji_only:
-                keep_mask.append(False)
-                removed_categories['emoji_only'] += 1
-                continue
+            # Remove excessive punctuation (keep basic .!?)
+            text = REPEATED_EXCLAIM_RE.sub('!', text)  # !!! -> !
+            text = REPEATED_DOTS_RE.sub('...', text)  # ...... -> ...
             
-            # KEEP the review if it passed all filters
-            keep_mask.append(True)
+            return text.strip()
+        
+        # Apply cleaning; missing values are filled up front instead of checked per review
+        text = review_text.fillna('')
+        if PYARROW_AVAILABLE:
+            # Same steps as whole-column Arrow compute kernels (RE2) over Arrow strings;
+            # only the few reviews containing '&' go through _unescape_entities
+            text = text.astype('string[pyarrow]')
+            has_entity = text.str.contains('&', regex=False).to_numpy(dtype=bool)
+            if has_entity.any():
+                text[has_entity] = text[has_entity].map(_unescape_entities)
+            text = (text.str.replace(ARROW_WHITESPACE_PATTERN, ' ', regex=True)
+                    .str.replace(REPEATED_EXCLAIM_RE.pattern, '!', regex=True)
+                    .str.replace(REPEATED_DOTS_RE.pattern, '...', regex=True))
+            # Whitespace runs are single spaces by now, so stripping spaces is a full strip
+            return text.str.strip(' ')
+        return text.astype(str).map(clean_single_text)
+    
+    def filter_clean_and_validate(self):
+        """
+        Language filtering, text cleaning and rating validation in one pass:
+        every mask is computed on the same frame and the frame is sliced once
+        """
+        before_count = len(self.df)
         
-        # Apply the filter
-        self.df = self.df[keep_mask]
-        total_removed = before_count - len(self.df)
+        print("\n🌍 Applying targeted language filtering...")
+        kept, removed_categories = self._language_filter_mask(self.df['review_text'])
         
         # Detailed removal report
         print(f" Targeted filtering completed:")
         for category, count in removed_categories.items():
             if count > 0:
                 print(f"   {category}: {count}")
-        print(f"   Kept {len(self.df)} meaningful reviews")
+        print(f"   Kept {int(kept.sum())} meaningful reviews")
+        self.stats['language_filtered'] = before_count - int(kept.sum())
+        
+        print("\n⭐ Validating ratings...")
+        # Invalid ratings are counted among the reviews that survive the language filter
+        invalid_mask = kept & ~self.df['rating'].between(1, 5).to_numpy(dtype=bool, na_value=False)
+        invalid_count = int(invalid_mask.sum())
+        if invalid_count > 0:
+            print(f"  Found {invalid_count} invalid ratings:")
+            invalid_ratings = self.df['rating'][invalid_mask].value_counts()
+            for rating, count in invalid_ratings.items():
+                print(f"   Rating {rating}: {count} reviews")
+            print(f" Removed {invalid_count} invalid ratings")
+        else:
+            print(" All ratings are valid (1-5 stars)")
+        self.stats['invalid_ratings'] = invalid_count
+        
+        print("\n✨ Cleaning review text...")
+        # Only surviving reviews are cleaned; text length is added in the same slice
+        keep_mask = kept & ~invalid_mask
+        cleaned = self._clean_review_text(self.df['review_text'][keep_mask])
+        self.df = self.df[keep_mask].assign(review_text=cleaned, text_length=cleaned.str.len())
         
-        self.stats['language_filtered'] = total_removed
+        print(" Text cleaning completed")
+        print(f"   Average length: {self.df['text_length'].mean():.1f} characters")
     
     def normalize_dates(self):  # ADDED: Missing method
         """Normalize dates to YYYY-MM-DD format"""
         print("\n📅 Normalizing dates...")
         
         try:
-            # Convert to datetime and format as YYYY-MM-DD
-            self.df['review_date'] = pd.to_datetime(self.df['review_date']).dt.strftime('%Y-%m-%d')
+            # The scraper writes ISO datetimes ('%Y-%m-%d %H:%M:%S' in the CSV, native timestamps
+            # in Parquet); the ISO8601 fast path skips per-row format inference for all of them
+            raw_dates = self.df['review_date']
+            dates = pd.to_datetime(raw_dates, format='ISO8601', errors='coerce', cache=True)
+            other_format = dates.isna() & raw_dates.notna()
+            if other_format.any():
+                dates[other_format] = pd.to_datetime(raw_dates[other_format], format='mixed', errors='coerce')
+            
+            # Unparseable dates are left blank in the output, so report them like invalid ratings
+            unparseable = dates.isna() & raw_dates.notna()
+            unparseable_count = int(unparseable.sum())
+            if unparseable_count > 0:
+                print(f"  Found {unparseable_count} unparseable dates (saved as blank):")
+                for raw_date, count in raw_dates[unparseable].astype(str).value_counts().head(5).items():
+                    print(f"   '{raw_date}': {count} reviews")
+            
+            # Keep native datetime64 (day precision); it is formatted as YYYY-MM-DD when saved
+            self.df['review_date'] = dates.dt.normalize()
             print(" Dates normalized to YYYY-MM-DD")
             
             # Show date range
-            date_range = f"{self.df['review_date'].min()} to {self.df['review_date'].max()}"
+            date_range = f"{self.df['review_date'].min():%Y-%m-%d} to {self.df['review_date'].max():%Y-%m-%d}"
             print(f"📆 Date range: {date_range}")
             
         except Exception as e:
             print(f" Error normalizing dates: {e}")
     
-    def clean_text_content(self):
-        """Clean review text while preserving meaning"""
-        print("\n✨ Cleaning review text...")
-        
-        def clean_single_text(text):
-            if pd.isna(text) or text == '':
-                return ""
-            
-            text = str(text).strip()
-            
-            # Replace multiple spaces/tabs/newlines with single space
-            text = re.sub(r'\s+', ' ', text)
-            
-            # Remove excessive punctuation (keep basic .!?)
-            text = re.sub(r'[!?]{3,}', '!', text)  # !!! -> !
-            text = re.sub(r'\.{3,}', '...', text)  # ...... -> ...
-            
-            # Clean up common issues but preserve content
-            text = text.replace('&amp;', '&')
-            text = text.replace('&quot;', '"')
-            text = text.replace('&lt;', '<')
-            text = text.replace('&gt;', '>')
-            
-            return text.strip()
-        
-        # Apply cleaning
-        self.df['review_text'] = self.df['review_text'].apply(clean_single_text)
-        
-        # Add text length for analysis
-        self.df['text_length'] = self.df['review_text'].str.len()
-        
-        print(" Text cleaning completed")
-        print(f"   Average length: {self.df['text_length'].mean():.1f} characters")
-    
-    def validate_ratings(self):
-        """Validate and clean rating values"""
-        print("\n⭐ Validating ratings...")
-        
-        before = len(self.df)
-        
-        # Check for invalid ratings
-        invalid_mask = ~self.df['rating'].between(1, 5)
-        invalid_count = invalid_mask.sum()
-        
-        if invalid_count > 0:
-            print(f"  Found {invalid_count} invalid ratings:")
-            invalid_ratings = self.df[invalid_mask]['rating'].value_counts()
-            for rating, count in invalid_ratings.items():
-                print(f"   Rating {rating}: {count} reviews")
-            
-            # Remove invalid ratings
-            self.df = self.df[~invalid_mask]
-            print(f" Removed {invalid_count} invalid ratings")
-        else:
-            print(" All ratings are valid (1-5 stars)")
-        
-        self.stats['invalid_ratings'] = invalid_count
-    
     def select_final_columns(self):
         """
         Select only Task 1 required columns for final output
@@ -323,8 +482,9 @@ class ReviewPreprocessor:
         print("\n Validating final data quality...")
         
         # Final missing data check
-        missing_final = self.df.isnull().sum().sum()
-        total_cells = len(self.df) * len(self.df.columns)
+        # Column-by-column so no full N x C boolean frame is materialized
+        missing_final = int(sum(self.df[col].isna().sum() for col in self.df.columns))
+        total_cells = self.df.size
         missing_percentage = (missing_final / total_cells) * 100 if total_cells > 0 else 0
         
         self.stats['final_count'] = len(self.df)
@@ -349,7 +509,7 @@ class ReviewPreprocessor:
             os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
             
             # Save to CSV
-            self.df.to_csv(self.output_path, index=False)
+            self.df.to_csv(self.output_path, index=False, date_format='%Y-%m-%d')
             print(f" Processed data saved to: {self.output_path}")
             return True
             
@@ -378,23 +538,26 @@ class ReviewPreprocessor:
         # Bank-wise final count
         print(f"\n🏦 FINAL REVIEWS PER BANK:")
         bank_counts = self.df['bank'].value_counts()
+        bank_counts = bank_counts[bank_counts > 0]  # categorical counts include banks with no rows left
         for bank, count in bank_counts.items():
             status = " TARGET MET" if count >= 400 else "⚠️ NEEDS MORE"
             print(f"   {bank}: {count} reviews - {status}")
         
         # Rating distribution
         print(f"\n⭐ RATING DISTRIBUTION:")
+        n_reviews = len(self.df)
         rating_counts = self.df['rating'].value_counts().sort_index(ascending=False)
         for rating, count in rating_counts.items():
-            percentage = (count / len(self.df)) * 100
+            percentage = (count / n_reviews) * 100
             stars = '⭐' * int(rating)
             print(f"   {stars} ({rating}): {count} reviews ({percentage:.1f}%)")
         
         # Text statistics
         print(f"\n📝 TEXT STATISTICS:")
-        print(f"   Average length: {self.df['review'].str.len().mean():.1f} chars")
-        print(f"   Shortest review: {self.df['review'].str.len().min()} chars")
-        print(f"   Longest review: {self.df['review'].str.len().max()} chars")
+        review_lengths = self.df['review'].str.len().to_numpy()
+        print(f"   Average length: {review_lengths.mean():.1f} chars")
+        print(f"   Shortest review: {review_lengths.min()} chars")
+        print(f"   Longest review: {review_lengths.max()} chars")
         
         # Sample of cleaned reviews
         print(f"\n SAMPLE CLEANED REVIEWS:")
@@ -408,16 +571,11 @@ class ReviewPreprocessor:
         print("🚀 STARTING ENHANCED PREPROCESSING PIPELINE")
         print("=" * 50)
         
-        if not self.load_data():
+        if not self.load_and_filter():
             return False
         
         # Enhanced processing steps
-        self.remove_duplicates_comprehensive()
-        self.handle_missing_values()
-        self.smart_language_filter()
         self.normalize_dates()
-        self.clean_text_content()
-        self.validate_ratings()
         self.select_final_columns()
         self.validate_data_quality()
         
@@ -428,6 +586,20 @@ class ReviewPreprocessor:
         return False
 
 
+def _load_and_filter_impl(input_path, input_parquet_path, cache_key):
+    """Row-reducing pipeline stages; module-level so joblib.Memory can cache it"""
+    preprocessor = ReviewPreprocessor()
+    preprocessor.input_path = input_path
+    preprocessor.input_parquet_path = input_parquet_path
+    if not preprocessor.load_data():
+        return None, preprocessor.stats
+    
+    preprocessor.remove_duplicates_comprehensive()
+    preprocessor.handle_missing_values()
+    preprocessor.filter_clean_and_validate()
+    return preprocessor.df, preprocessor.stats
+
+
 def main():
     """Main execution function"""
     preprocessor = ReviewPreprocessor()
@@ -10,24 +10,186 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
 from google_play_scraper import app, reviews, Sort
+from google_play_scraper.exceptions import ExtraHTTPError, NotFoundError
+import google_play_scraper.utils.request as play_request
 import time
+import json
+import argparse
+import random
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
-from datetime import datetime
+from datetime import datetime, date
 from config import APP_IDS, BANK_NAMES, SCRAPING_CONFIG, DATA_PATHS, create_data_directories
 
+try:
+    import pyarrow as pa  # optional: C++ CSV writer and Parquet copy of the raw reviews
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# google_play_scraper review fields -> raw CSV columns
+REVIEW_FIELD_NAMES = {
+    'reviewId': 'review_id',
+    'content': 'review_text',
+    'score': 'rating',
+    'at': 'review_date',
+    'userName': 'user_name',
+    'thumbsUpCount': 'thumbs_up',
+    'reviewCreatedVersion': 'app_version'
+}
+
+# Fixed Arrow schema of the raw reviews Parquet file, so every bank's row group matches
+# (e.g. an all-null column in one bank still writes as strings)
+RAW_REVIEWS_SCHEMA = pa.schema([
+    ('review_id', pa.string()),
+    ('review_text', pa.string()),
+    ('rating', pa.int64()),
+    ('review_date', pa.timestamp('us')),
+    ('user_name', pa.string()),
+    ('thumbs_up', pa.int64()),
+    ('app_version', pa.string()),
+    ('bank_code', pa.dictionary(pa.int8(), pa.string())),
+    ('bank_name', pa.dictionary(pa.int8(), pa.string())),
+    ('app_name', pa.string()),
+    ('source', pa.dictionary(pa.int8(), pa.string())),
+    ('original_length', pa.int64()),
+    ('has_reply', pa.bool_())
+]) if PYARROW_AVAILABLE else None
+
+# Reviews requested per page, and the pause between page requests (seconds)
+REVIEWS_PAGE_SIZE = 200
+PAGE_DELAY = 1
+
+# Keep-alive connection pool shared by all bank threads, and per-request timeout (seconds)
+HTTP_POOL_SIZE = 20
+HTTP_TIMEOUT = 30
+
+# Upper bound for any backoff or page delay (seconds)
+MAX_BACKOFF_DELAY = 60
+
+# 'Retry-After: 30' / 'retry after 30s' style hints in rate-limit error messages
+RETRY_AFTER_RE = re.compile(r'retry[- _]?after\D{0,3}(\d+(?:\.\d+)?)', re.IGNORECASE)
+
+
+def write_reviews_csv(df, path):
+    """Write reviews to CSV, with pyarrow's multithreaded C++ writer when available"""
+    if not PYARROW_AVAILABLE:
+        df.to_csv(path, index=False)
+        return
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Second-resolution timestamps keep the '%Y-%m-%d %H:%M:%S' format of the pandas writer
+    for i, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.timestamp('s'), safe=False))
+    pacsv.write_csv(table, path, write_options=pacsv.WriteOptions(batch_size=8192))
+
+
+def _session_urlopen(session):
+    """
+    Drop-in for google_play_scraper's urllib opener that sends requests over a
+    pooled session, so TCP/TLS connections are reused across pages and banks.
+    Keeps the library's 404 / other-HTTP-error exceptions and its retry logic.
+    """
+    def urlopen(obj):
+        if isinstance(obj, str):
+            resp = session.get(obj, timeout=HTTP_TIMEOUT)
+        else:
+            resp = session.request(obj.get_method(), obj.full_url, data=obj.data,
+                                   headers=dict(obj.header_items()), timeout=HTTP_TIMEOUT)
+        if resp.status_code == 404:
+            raise NotFoundError("App not found(404).")
+        if resp.status_code >= 400:
+            raise ExtraHTTPError(f"App not found. Status code {resp.status_code} returned.")
+        return resp.content.decode('UTF-8')
+    return urlopen
+
+
+class BackpressureController:
+    """
+    AIMD pacing shared by all bank threads: the delay between page requests
+    grows multiplicatively on failures and shrinks additively on successes,
+    never below the polite base delay
+    """
+    
+    def __init__(self, base_delay=None, max_delay=MAX_BACKOFF_DELAY, step=0.25, beta=0.5):
+        self.base_delay = PAGE_DELAY if base_delay is None else base_delay
+        self.max_delay = max_delay
+        self.step = step
+        self.beta = beta
+        self.delay = self.base_delay
+        self._lock = threading.Lock()
+    
+    def on_result(self, ok):
+        """Record one request outcome and adjust the shared delay"""
+        with self._lock:
+            if ok:
+                self.delay = max(self.base_delay, self.delay - self.step)
+            else:
+                self.delay = min(self.max_delay, max(self.delay, self.step) / self.beta)
+    
+    def wait(self):
+        """Sleep for the current page delay"""
+        time.sleep(self.delay)
+
 
 class EthiopianBankScraper:
     """Enhanced scraper with robust error handling and retry logic"""
     
-    def __init__(self):
+    def __init__(self, force_refresh=False):
+        self.force_refresh = force_refresh  # Ignore today's cached app info/reviews
         self.app_ids = APP_IDS
         self.bank_names = BANK_NAMES
         self.config = SCRAPING_CONFIG
         self.app_info_data = []
+        self._app_cache = {}  # app_id -> app() result, shared by collect_app_info and scrape_single_bank
+        self.pacer = BackpressureController()
+        
+        # File writes run in order on one background thread so disk I/O overlaps
+        # the network-bound scraping; flush_writes() waits for them
+        self._io_pool = ThreadPoolExecutor(max_workers=1)
+        self._pending_writes = []
+        
+        # One keep-alive session behind every google_play_scraper call
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+        self._session.mount('https://', adapter)
+        self._original_urlopen = play_request._urlopen
+        play_request._urlopen = _session_urlopen(self._session)
         
         # CREATE DIRECTORIES when scraper initializes
         self._create_directories()
+    
+    def close(self):
+        """Finish pending writes, close pooled connections and restore google_play_scraper's default opener"""
+        try:
+            self.flush_writes()
+        finally:
+            self._io_pool.shutdown(wait=True)
+            play_request._urlopen = self._original_urlopen
+            self._session.close()
+    
+    def _write_in_background(self, fn, *args, **kwargs):
+        """Queue a file write on the I/O thread"""
+        self._pending_writes.append(self._io_pool.submit(fn, *args, **kwargs))
+    
+    def flush_writes(self):
+        """Block until every queued write is on disk, re-raising the first failure"""
+        pending, self._pending_writes = self._pending_writes, []
+        for future in pending:
+            future.result()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
         
     def _create_directories(self):
         """Create necessary data directories"""
@@ -42,47 +204,121 @@ class EthiopianBankScraper:
             os.makedirs('data/processed', exist_ok=True)
             print(" Directories created (fallback)")
         
-    def scrape_with_retry(self, app_id, bank_name):
-        """
-        Scrape reviews with retry mechanism for reliability
+    def _fetch_page_with_retry(self, app_id, bank_name, count, continuation_token):
+        """Fetch one page of reviews, retrying only that page on failure
+        
+        Returns (reviews, continuation_token), or (None, None) once all retries fail.
         """
         for attempt in range(self.config['max_retries']):
             try:
-                print(f"   Attempt {attempt + 1}/{self.config['max_retries']} for {bank_name}...")
-                
-                reviews_data, continuation_token = reviews(
+                result = reviews(
                     app_id,
                     lang=self.config['lang'],
                     country=self.config['country'], 
                     sort=Sort.NEWEST,
-                    count=self.config['reviews_per_bank']
+                    count=count,
+                    continuation_token=continuation_token
                 )
-                
-                print(f"    Success on attempt {attempt + 1}")
-                return reviews_data
+                self.pacer.on_result(ok=True)
+                return result
                 
             except Exception as e:
-                print(f"    Attempt {attempt + 1} failed: {str(e)}")
+                print(f"    Attempt {attempt + 1}/{self.config['max_retries']} failed for {bank_name}: {str(e)}")
+                self.pacer.on_result(ok=False)
                 
                 # If this wasn't the last attempt, wait before retrying
                 if attempt < self.config['max_retries'] - 1:
-                    wait_time = self.config['retry_delay'] * (attempt + 1)  # Exponential backoff
-                    print(f"    Waiting {wait_time} seconds before retry...")
+                    wait_time = self._backoff_delay(attempt, e)
+                    print(f"    Waiting {wait_time:.1f} seconds before retry...")
                     time.sleep(wait_time)
-                else:
-                    print(f"    All {self.config['max_retries']} attempts failed for {bank_name}")
-                    return []
         
-        return []  # Should never reach here, but for safety
+        print(f"    All {self.config['max_retries']} attempts failed for {bank_name}")
+        return None, None
+    
+    def _backoff_delay(self, attempt, error):
+        """
+        Exponential backoff with jitter, capped at MAX_BACKOFF_DELAY; a
+        Retry-After hint in the error message takes precedence when present
+        """
+        retry_after = RETRY_AFTER_RE.search(str(error))
+        if retry_after:
+            return min(MAX_BACKOFF_DELAY, float(retry_after.group(1)))
+        delay = min(MAX_BACKOFF_DELAY, self.config['retry_delay'] * 2 ** attempt)
+        return delay * (0.5 + random.random() * 0.5)
+    
+    def scrape_with_retry(self, app_id, bank_name):
+        """
+        Scrape reviews page by page with a retry mechanism for reliability
+        
+        Following the continuation token means a failed request only retries its
+        own page, and reviews from earlier pages are kept if later pages fail.
+        """
+        target = self.config['reviews_per_bank']
+        collected = []
+        continuation_token = None
+        
+        print(f"   Fetching up to {target} reviews for {bank_name}...")
+        while len(collected) < target:
+            # The page size is fixed by the first call and carried in the token
+            batch, continuation_token = self._fetch_page_with_retry(
+                app_id, bank_name, min(REVIEWS_PAGE_SIZE, target), continuation_token
+            )
+            if not batch:
+                break
+            
+            collected.extend(batch)
+            if len(collected) < target:
+                self.pacer.wait()  # Polite, load-adaptive delay between paginated requests
+        
+        if collected:
+            print(f"    Fetched {min(len(collected), target)} reviews for {bank_name}")
+        return collected[:target]
+    
+    def _cache_path(self, app_id, suffix):
+        """Per-app, per-day cache file for scraped data"""
+        return os.path.join(DATA_PATHS['scrape_cache'], f"{app_id}_{date.today():%Y-%m-%d}{suffix}")
+    
+    def _get_app_info(self, app_id):
+        """App metadata, fetched at most once per run and read from today's cache unless a refresh is forced"""
+        if app_id in self._app_cache:
+            return self._app_cache[app_id]
+        
+        cache_path = self._cache_path(app_id, '.json')
+        if not self.force_refresh and os.path.exists(cache_path):
+            with open(cache_path, encoding='utf-8') as f:
+                app_info = json.load(f)
+        else:
+            app_info = app(app_id)
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump(app_info, f, default=str)
+        self._app_cache[app_id] = app_info
+        return app_info
+    
+    def _max_workers(self):
+        """Concurrent request threads: one per bank, capped by the configured concurrency"""
+        return max(1, min(self.config.get('concurrency', len(self.app_ids)), len(self.app_ids)))
     
     def collect_app_info(self):
         """Collect app information with error handling"""
         print("📱 Collecting App Information...")
         print("-" * 50)
         
-        for bank_code, app_id in self.app_ids.items():
+        # Metadata requests are independent per app: issue them concurrently,
+        # then report in bank order
+        def fetch_app_info(app_id):
             try:
-                app_info = app(app_id)
+                return self._get_app_info(app_id), None
+            except Exception as e:
+                return None, e
+        
+        with ThreadPoolExecutor(max_workers=self._max_workers()) as executor:
+            fetched = list(executor.map(fetch_app_info, self.app_ids.values()))
+        
+        for (bank_code, app_id), (app_info, error) in zip(self.app_ids.items(), fetched):
+            try:
+                if error is not None:
+                    raise error
                 
                 app_data = {
                     'bank_code': bank_code,
@@ -121,7 +357,7 @@ class EthiopianBankScraper:
         """Save app information to CSV"""
         if self.app_info_data:
             app_info_df = pd.DataFrame(self.app_info_data)
-            app_info_df.to_csv(DATA_PATHS['app_info'], index=False)
+            self._write_in_background(app_info_df.to_csv, DATA_PATHS['app_info'], index=False)
             print(f"💾 App info saved to: {DATA_PATHS['app_info']}")
             return True
         return False
@@ -129,8 +365,15 @@ class EthiopianBankScraper:
     def scrape_single_bank(self, bank_code, app_id):
         """Scrape reviews for a single bank with retry mechanism"""
         try:
-            # Get app info
-            app_info = app(app_id)
+            # Today's reviews for this app (and target count) are reused unless forced
+            cache_path = self._cache_path(app_id, f"_{self.config['reviews_per_bank']}.parquet")
+            if PYARROW_AVAILABLE and not self.force_refresh and os.path.exists(cache_path):
+                cached_reviews = pd.read_parquet(cache_path)
+                print(f"♻️ {self.bank_names[bank_code]}: Using {len(cached_reviews)} cached reviews from today")
+                return cached_reviews
+            
+            # Get app info (already fetched by collect_app_info, so normally a cache read)
+            app_info = self._get_app_info(app_id)
             actual_app_name = app_info.get('title', 'Unknown App')
             
             print(f"📥 Scraping {self.bank_names[bank_code]}...")
@@ -140,33 +383,32 @@ class EthiopianBankScraper:
             
             if not reviews_data:
                 print(f" No reviews collected for {self.bank_names[bank_code]}")
-                return []
+                return pd.DataFrame()
             
-            # Process reviews
-            processed_reviews = []
-            for review in reviews_data:
-                processed_reviews.append({
-                    'review_id': review.get('reviewId', ''),
-                    'review_text': review.get('content', ''),
-                    'rating': review.get('score', 0),
-                    'review_date': review.get('at', datetime.now()),
-                    'user_name': review.get('userName', 'Anonymous'),
-                    'thumbs_up': review.get('thumbsUpCount', 0),
-                    'app_version': review.get('reviewCreatedVersion', 'N/A'),
-                    'bank_code': bank_code,
-                    'bank_name': self.bank_names[bank_code],
-                    'app_name': actual_app_name,
-                    'source': 'Google Play',
-                    'original_length': len(review.get('content', '')),
-                    'has_reply': review.get('replyContent') is not None
-                })
+            # One list per column (per-review defaults for missing keys), so the frame is
+            # built in one pass without list-of-dicts schema inference
+            defaults = {'reviewId': '', 'content': '', 'score': 0, 'at': datetime.now(),
+                        'userName': 'Anonymous', 'thumbsUpCount': 0, 'reviewCreatedVersion': 'N/A'}
+            processed_reviews = pd.DataFrame({
+                column: [review.get(field, defaults[field]) for review in reviews_data]
+                for field, column in REVIEW_FIELD_NAMES.items()
+            })
+            processed_reviews['bank_code'] = bank_code
+            processed_reviews['bank_name'] = self.bank_names[bank_code]
+            processed_reviews['app_name'] = actual_app_name
+            processed_reviews['source'] = 'Google Play'
+            processed_reviews['original_length'] = processed_reviews['review_text'].str.len().fillna(0).astype(int)
+            processed_reviews['has_reply'] = [review.get('replyContent') is not None for review in reviews_data]
             
             print(f" {self.bank_names[bank_code]}: Collected {len(processed_reviews)} raw reviews")
+            if PYARROW_AVAILABLE:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                processed_reviews.to_parquet(cache_path, index=False)
             return processed_reviews
             
         except Exception as e:
             print(f" Critical error scraping {self.bank_names[bank_code]}: {e}")
-            return []
+            return pd.DataFrame()
     
     def scrape_all_banks(self):
         """Scrape reviews for all banks with comprehensive error handling"""
@@ -182,27 +424,56 @@ class EthiopianBankScraper:
         self.collect_app_info()
         self.save_app_info()
         
-        # Scrape each bank
-        for bank_code, app_id in tqdm(self.app_ids.items(), desc="Scraping Banks"):
-            bank_reviews = self.scrape_single_bank(bank_code, app_id)
-            
-            if bank_reviews:  # Only count if we got reviews
-                all_reviews.extend(bank_reviews)
-                successful_banks += 1
-            else:
-                print(f"  Skipping {self.bank_names[bank_code]} - no reviews collected")
+        # Each bank's reviews are streamed to the Parquet file as one row group as soon
+        # as that bank is done; the file is only moved into place once complete
+        parquet_path = DATA_PATHS['raw_reviews_parquet']
+        partial_path = parquet_path + '.partial'
+        writer = None
+        
+        # Scrape banks concurrently: each is network-bound on its own app's requests.
+        # Results are still collected in bank order.
+        with ThreadPoolExecutor(max_workers=self._max_workers()) as executor:
+            futures = {bank_code: executor.submit(self.scrape_single_bank, bank_code, app_id)
+                       for bank_code, app_id in self.app_ids.items()}
             
-            # Polite delay between banks
-            time.sleep(2)
+            for bank_code, future in tqdm(futures.items(), desc="Scraping Banks"):
+                bank_reviews = future.result()
+                
+                if not bank_reviews.empty:  # Only count if we got reviews
+                    all_reviews.append(bank_reviews)
+                    successful_banks += 1
+                    if PYARROW_AVAILABLE:
+                        if writer is None:
+                            writer = pq.ParquetWriter(partial_path, RAW_REVIEWS_SCHEMA, compression='zstd')
+                        self._write_in_background(
+                            writer.write_table, pa.Table.from_pandas(bank_reviews, schema=RAW_REVIEWS_SCHEMA,
+                                                                     preserve_index=False))
+                else:
+                    print(f"  Skipping {self.bank_names[bank_code]} - no reviews collected")
         
         # Create DataFrame and save
         if all_reviews:
-            comprehensive_df = pd.DataFrame(all_reviews)
-            comprehensive_df.to_csv(DATA_PATHS['raw_reviews'], index=False)
+            comprehensive_df = pd.concat(all_reviews, ignore_index=True)
+            
+            # Few distinct values: store as int8 codes, categories in configured bank order
+            comprehensive_df['bank_code'] = pd.Categorical(comprehensive_df['bank_code'],
+                                                           categories=list(self.app_ids))
+            comprehensive_df['bank_name'] = pd.Categorical(comprehensive_df['bank_name'],
+                                                           categories=[self.bank_names[c] for c in self.app_ids])
+            comprehensive_df['source'] = comprehensive_df['source'].astype('category')
+            self._write_in_background(write_reviews_csv, comprehensive_df, DATA_PATHS['raw_reviews'])
+            if writer is not None:
+                # Typed, compressed columnar copy that preprocessing loads without CSV parsing;
+                # closed after the CSV export so it is never older than the CSV
+                self._write_in_background(writer.close)
+                self._write_in_background(os.replace, partial_path, parquet_path)
             self._generate_scraping_summary(comprehensive_df, successful_banks)
+            # Outputs are complete on disk once this returns
+            self.flush_writes()
             return comprehensive_df
         else:
             print(" CRITICAL: No reviews collected from any bank!")
+            self.flush_writes()
             return pd.DataFrame()
     
     def _generate_scraping_summary(self, df, successful_banks):
@@ -216,8 +487,8 @@ class EthiopianBankScraper:
         print(f"Total Raw Reviews: {total_reviews}")
         
         print("\n🏦 Raw Reviews per Bank:")
-        for bank_name in df['bank_name'].unique():
-            bank_count = len(df[df['bank_name'] == bank_name])
+        # One counting pass over the bank codes; banks with no reviews are listed with 0
+        for bank_name, bank_count in df['bank_name'].value_counts(sort=False).items():
             status = "✅" if bank_count >= 400 else "⚠️ "
             print(f"  {status} {bank_name}: {bank_count} reviews")
         
@@ -233,9 +504,14 @@ class EthiopianBankScraper:
 
 def main():
     """Main execution function with top-level error handling"""
+    parser = argparse.ArgumentParser(description="Scrape Google Play reviews for Ethiopian bank apps")
+    parser.add_argument('--force', action='store_true',
+                        help="re-scrape even if today's app info/reviews are cached")
+    args = parser.parse_args()
+    
     try:
-        scraper = EthiopianBankScraper()
-        df = scraper.scrape_all_banks()
+        with EthiopianBankScraper(force_refresh=args.force) as scraper:
+            df = scraper.scrape_all_banks()
         
         if df.empty:
             print("\n SCRAPING FAILED: No data collected")
@@ -5,31 +5,59 @@ Using DistilBERT for high-accuracy sentiment classification
 
 import pandas as pd
 import numpy as np
-from transformers import pipeline
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch
 from tqdm import tqdm
 import sys
 import os
+import gc
+from concurrent.futures import ThreadPoolExecutor
 
 # Add parent directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from config import DATA_PATHS
 
+try:
+    # Optional: INT8-quantized ONNX Runtime model for CPU inference
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    ORT_AVAILABLE = True
+except ImportError:
+    ORT_AVAILABLE = False
+
+try:
+    # Optional: lexicon-based VADER prefilter for clear-cut reviews
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    VADER_AVAILABLE = True
+except ImportError:
+    VADER_AVAILABLE = False
+
+ONNX_INT8_FILE = 'model_quantized.onnx'
+
+# |VADER compound| at or above which a review is labelled without the transformer
+VADER_CONFIDENT_COMPOUND = 0.5
+
+# Confidence band (inclusive) treated as NEUTRAL in the 3-class system
+NEUTRAL_SCORE_RANGE = (0.4, 0.6)
+
 class SentimentAnalyzer:
     """Enhanced sentiment analysis with DistilBERT and confidence scoring"""
     
-    def __init__(self, model_name="distilbert-base-uncased-finetuned-sst-2-english"):
+    def __init__(self, model_name="distilbert-base-uncased-finetuned-sst-2-english", vader_prefilter=False):
         print("🤖 Loading DistilBERT sentiment model...")
         
-        # Initialize the sentiment pipeline
-        self.sentiment_pipeline = pipeline(
-            "sentiment-analysis",
-            model=model_name,
-            tokenizer=model_name,
-            truncation=True,
-            max_length=512,
-            device=0 if torch.cuda.is_available() else -1  # Use GPU if available
-        )
+        # Tokenizer and model used directly (instead of a pipeline) so each batch
+        # is padded only to its own longest review
+        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')  # Use GPU if available
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.max_length = 512
+        
+        self.model_name = model_name
+        self._load_model()
+        
+        # Opt-in: VADER labels clearly positive/negative reviews, only borderline ones
+        # reach DistilBERT (faster, but an approximation of the model's labels)
+        self.vader = self._load_vader() if vader_prefilter else None
         
         self.stats = {
             'total_reviews': 0,
@@ -37,26 +65,147 @@ class SentimentAnalyzer:
             'failed_analysis': 0
         }
     
-    def analyze_sentiment_batch(self, texts, batch_size=32):
-        """Analyze sentiment in batches for efficiency"""
-        results = []
+    def _load_model(self):
+        """Load (or reload after release()) the classification model onto the device"""
+        # On CPU: INT8 ONNX Runtime graph (VNNI dot products, quarter-size weights) if available
+        self.model = None
+        if self.device.type == 'cpu' and ORT_AVAILABLE:
+            self.model = self._load_onnx_int8(self.model_name)
+        if self.model is None:
+            self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name).to(self.device).eval()
+        self.id2label = self.model.config.id2label
         
-        for i in tqdm(range(0, len(texts), batch_size), desc="Analyzing Sentiment"):
-            batch = texts[i:i + batch_size]
+        # On GPU: half precision (tensor cores, half the memory traffic) and a compiled
+        # graph; dynamic shapes because every length bucket pads to a different size
+        if self.device.type == 'cuda':
+            self.model = self.model.half()
+        self.eager_model = self.model
+        if self.device.type == 'cuda' and hasattr(torch, 'compile'):
+            self.model = torch.compile(self.model, mode='reduce-overhead', dynamic=True)
+    
+    def release(self):
+        """Free the model (and cached GPU memory); it is reloaded on the next analysis"""
+        self.model = None
+        self.eager_model = None
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    
+    def _load_vader(self):
+        """VADER analyzer for the prefilter, or None if NLTK or its lexicon is missing"""
+        if not VADER_AVAILABLE:
+            print("⚠️ NLTK not installed; VADER prefilter disabled")
+            return None
+        try:
+            return SentimentIntensityAnalyzer()
+        except LookupError:
+            print("⚠️ VADER lexicon missing (nltk.download('vader_lexicon')); VADER prefilter disabled")
+            return None
+    
+    def _load_onnx_int8(self, model_name):
+        """Load the dynamically quantized ONNX model, exporting it once per model name"""
+        save_dir = os.path.join(DATA_PATHS['onnx_models'], model_name.replace('/', '__') + '-int8')
+        try:
+            if not os.path.exists(os.path.join(save_dir, ONNX_INT8_FILE)):
+                print("   Exporting INT8 ONNX model (first run only)...")
+                ort_model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+                quantizer = ORTQuantizer.from_pretrained(ort_model)
+                quantizer.quantize(save_dir=save_dir,
+                                   quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False))
+                ort_model.config.save_pretrained(save_dir)
+            model = ORTModelForSequenceClassification.from_pretrained(save_dir, file_name=ONNX_INT8_FILE)
+            print("   Using INT8 ONNX Runtime model")
+            return model
+        except Exception as e:
+            print(f"⚠️ ONNX Runtime model unavailable ({e}); using PyTorch")
+            return None
+    
+    def _tokenize(self, texts):
+        """Token ids for every text, truncated but not yet padded"""
+        return self.tokenizer(texts, truncation=True, max_length=self.max_length)
+    
+    def _encode(self, features):
+        """Pad one batch of pre-tokenized texts to its longest member"""
+        return self.tokenizer.pad(features, padding=True, return_tensors='pt')
+    
+    def _predict(self, encoded):
+        """Label and top-class probability for one tokenized batch"""
+        if self.model is None:
+            self._load_model()
+        encoded = encoded.to(self.device)
+        with torch.inference_mode():
             try:
-                batch_results = self.sentiment_pipeline(batch)
-                results.extend(batch_results)
+                logits = self.model(**encoded).logits
             except Exception as e:
-                print(f"❌ Batch {i//batch_size + 1} failed: {e}")
-                # Add neutral sentiment for failed batches
-                results.extend([{'label': 'NEUTRAL', 'score': 0.5}] * len(batch))
-                self.stats['failed_analysis'] += len(batch)
+                if self.model is self.eager_model:
+                    raise
+                # Compilation happens on first use; fall back to eager mode if it fails
+                print(f"⚠️ Compiled model failed ({e}); using eager mode")
+                self.model = self.eager_model
+                logits = self.model(**encoded).logits
+            # Softmax in float32 so FP16 logits still give full-precision scores
+            probs = torch.softmax(logits.float(), dim=-1)
+        scores, label_ids = probs.max(dim=-1)
+        return [{'label': self.id2label[label_id], 'score': score}
+                for label_id, score in zip(label_ids.tolist(), scores.tolist())]
+    
+    def analyze_sentiment_batch(self, texts, batch_size=32):
+        """Analyze sentiment in batches for efficiency"""
+        # Identical review texts ("good", "nice app", ...) are scored once and the
+        # result is shared by every copy
+        codes, unique_texts = pd.factorize(pd.Series(texts, dtype=object), use_na_sentinel=False)
+        unique_texts = unique_texts.tolist()
+        results = [None] * len(unique_texts)
+        failed = np.zeros(len(unique_texts), dtype=bool)
+        
+        to_model = np.arange(len(unique_texts))
+        if self.vader is not None:
+            compound = np.array([self.vader.polarity_scores(text)['compound'] for text in unique_texts])
+            confident = np.abs(compound) >= VADER_CONFIDENT_COMPOUND
+            for j in np.flatnonzero(confident):
+                # Map |compound| in [0.5, 1] to a top-class probability in [0.75, 1]
+                results[j] = {'label': 'POSITIVE' if compound[j] > 0 else 'NEGATIVE',
+                              'score': float(1 + abs(compound[j])) / 2}
+            to_model = np.flatnonzero(~confident)
+            print(f"   VADER labelled {int(confident.sum())} of {len(unique_texts)} unique reviews")
+        
+        # Texts are tokenized once up front so reviews with the same token count can
+        # be batched together and little padding is computed; results are written
+        # back in the original order
+        tokenized = self._tokenize([unique_texts[j] for j in to_model]) if len(to_model) else {}
+        token_lengths = [len(ids) for ids in tokenized.get('input_ids', [])]
+        positions = np.argsort(token_lengths, kind='stable')
+        batches = [positions[i:i + batch_size] for i in range(0, len(positions), batch_size)]
+        
+        def encode(batch_pos):
+            return self._encode({key: [values[p] for p in batch_pos]
+                                 for key, values in tokenized.items()})
         
-        return results
+        # The next batch is padded into tensors on a worker thread while the model
+        # runs on the current one
+        with ThreadPoolExecutor(max_workers=1) as tokenizer_pool:
+            pending = tokenizer_pool.submit(encode, batches[0]) if batches else None
+            for n, batch_pos in enumerate(tqdm(batches, desc="Analyzing Sentiment")):
+                batch_idx = to_model[batch_pos]
+                encoding = pending
+                if n + 1 < len(batches):
+                    pending = tokenizer_pool.submit(encode, batches[n + 1])
+                try:
+                    batch_results = self._predict(encoding.result())
+                except Exception as e:
+                    print(f"❌ Batch {n + 1} failed: {e}")
+                    # Add neutral sentiment for failed batches
+                    batch_results = [{'label': 'NEUTRAL', 'score': 0.5}] * len(batch_idx)
+                    failed[batch_idx] = True
+                for j, result in zip(batch_idx, batch_results):
+                    results[j] = result
+        
+        self.stats['failed_analysis'] += int(failed[codes].sum())
+        return [results[code] for code in codes]
     
     def apply_neutral_threshold(self, label, score):
         """Apply neutral threshold to create 3-class system"""
-        if 0.4 <= score <= 0.6:
+        if NEUTRAL_SCORE_RANGE[0] <= score <= NEUTRAL_SCORE_RANGE[1]:
             return 'NEUTRAL', score
         else:
             return label, score
@@ -82,26 +231,20 @@ class SentimentAnalyzer:
         # Analyze sentiment
         sentiment_results = self.analyze_sentiment_batch(texts)
         
-        # Extract and process labels and scores
-        sentiment_labels = []
-        sentiment_scores = []
-        sentiment_numeric = []
-        
-        for result in sentiment_results:
-            label = result['label'].upper()  # Ensure uppercase
-            score = result['score']
-            
-            # Apply neutral threshold
-            final_label, final_score = self.apply_neutral_threshold(label, score)
-            
-            sentiment_labels.append(final_label)
-            sentiment_scores.append(final_score)
-            sentiment_numeric.append(self.sentiment_to_numeric(final_label, final_score))
+        # Extract labels and scores, then apply the neutral threshold and the numeric
+        # scale (same rules as apply_neutral_threshold / sentiment_to_numeric) column-wise
+        labels = np.array([result['label'].upper() for result in sentiment_results])  # Ensure uppercase
+        scores = np.fromiter((result['score'] for result in sentiment_results),
+                             dtype=np.float64, count=len(sentiment_results))
+        
+        neutral = (scores >= NEUTRAL_SCORE_RANGE[0]) & (scores <= NEUTRAL_SCORE_RANGE[1])
+        final_labels = np.where(neutral, 'NEUTRAL', labels)
+        sign = np.select([final_labels == 'POSITIVE', final_labels == 'NEGATIVE'], [1.0, -1.0], 0.0)
         
         # Add to dataframe
-        df['sentiment_label'] = sentiment_labels
-        df['sentiment_score'] = sentiment_scores
-        df['sentiment_numeric'] = sentiment_numeric
+        df['sentiment_label'] = final_labels
+        df['sentiment_score'] = scores
+        df['sentiment_numeric'] = sign * scores
         
         self.stats['analyzed_reviews'] = len(sentiment_results)
         
@@ -111,20 +254,24 @@ class SentimentAnalyzer:
         """Generate comprehensive sentiment summary by bank and rating"""
         print("\n📊 Generating sentiment summary...")
         
+        # Categorical keys group on integer codes instead of rehashing strings
+        df = df.assign(bank=df['bank'].astype('category'),
+                       sentiment_label=df['sentiment_label'].astype('category'))
+        
+        def summarize(keys):
+            # Mean/count plus one column of review counts per sentiment label
+            grouped = df.groupby(keys, observed=True)
+            label_counts = grouped['sentiment_label'].value_counts().unstack(fill_value=0)
+            return grouped['sentiment_numeric'].agg(['mean', 'count']).join(label_counts).round(3)
+        
         # Summary by bank
-        bank_sentiment = df.groupby('bank').agg({
-            'sentiment_numeric': ['mean', 'count'],
-            'sentiment_label': lambda x: x.value_counts().to_dict()
-        }).round(3)
+        bank_sentiment = summarize('bank')
         
         # Summary by rating
-        rating_sentiment = df.groupby('rating').agg({
-            'sentiment_numeric': ['mean', 'count'],
-            'sentiment_label': lambda x: x.value_counts().to_dict()
-        }).round(3)
+        rating_sentiment = summarize('rating')
         
         # Combined bank + rating summary
-        bank_rating_sentiment = df.groupby(['bank', 'rating']).agg({
+        bank_rating_sentiment = df.groupby(['bank', 'rating'], observed=True).agg({
             'sentiment_numeric': 'mean',
             'sentiment_score': 'mean',
             'sentiment_label': 'count'
@@ -160,13 +307,13 @@ class SentimentAnalyzer:
             percentage = (count / len(df)) * 100
             print(f"   {sentiment}: {count} reviews ({percentage:.1f}%)")
         
+        # One groupby/crosstab pass per key instead of a full-frame filter per bank/rating
         print(f"\n🏦 SENTIMENT BY BANK:")
-        for bank in df['bank'].unique():
-            bank_data = df[df['bank'] == bank]
-            total = len(bank_data)
-            avg_sentiment = bank_data['sentiment_numeric'].mean()
-            
-            sentiment_counts = bank_data['sentiment_label'].value_counts()
+        bank_means = df.groupby('bank', sort=False, observed=True)['sentiment_numeric'].mean()
+        bank_counts = pd.crosstab(df['bank'], df['sentiment_label'])
+        for bank, avg_sentiment in bank_means.items():
+            sentiment_counts = bank_counts.loc[bank]
+            total = sentiment_counts.sum()
             print(f"\n   {bank} (Avg: {avg_sentiment:.3f}):")
             for sentiment in ['POSITIVE', 'NEUTRAL', 'NEGATIVE']:
                 count = sentiment_counts.get(sentiment, 0)
@@ -174,10 +321,11 @@ class SentimentAnalyzer:
                 print(f"     {sentiment}: {count} ({percentage:.1f}%)")
         
         print(f"\n⭐ SENTIMENT vs RATING CORRELATION:")
-        for rating in sorted(df['rating'].unique()):
-            rating_data = df[df['rating'] == rating]
-            avg_sentiment = rating_data['sentiment_numeric'].mean()
-            sentiment_dist = rating_data['sentiment_label'].value_counts()
+        rating_means = df.groupby('rating', observed=True)['sentiment_numeric'].mean()
+        rating_counts = pd.crosstab(df['rating'], df['sentiment_label'])
+        for rating, avg_sentiment in rating_means.items():
+            sentiment_dist = rating_counts.loc[rating]
+            sentiment_dist = sentiment_dist[sentiment_dist > 0].sort_values(ascending=False, kind='stable')
             print(f"   ⭐{rating}: Avg sentiment {avg_sentiment:.3f}")
             for label, count in sentiment_dist.items():
                 print(f"        {label}: {count} reviews")
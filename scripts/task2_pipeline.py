@@ -5,21 +5,46 @@ Task 2 Pipeline Orchestrator - Coordinates Sentiment & Thematic Analysis
 import pandas as pd
 import sys
 import os
+import functools
 from datetime import datetime
 
 # Add parent directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from config import DATA_PATHS
-from scripts.sentiment_analyzer import SentimentAnalyzer
-from scripts.theme_analyzer import ThemeAnalyzer
+
+@functools.lru_cache(maxsize=1)
+def _get_shared_sentiment_analyzer():
+    """Load the sentiment model once per process (imports torch on first use)"""
+    from scripts.sentiment_analyzer import SentimentAnalyzer
+    return SentimentAnalyzer()
+
+@functools.lru_cache(maxsize=1)
+def _get_shared_theme_analyzer():
+    """Build the theme analyzer once per process"""
+    from scripts.theme_analyzer import ThemeAnalyzer
+    return ThemeAnalyzer()
 
 class Task2Pipeline:
     """Orchestrates complete Task 2 analysis pipeline"""
     
     def __init__(self):
-        self.sentiment_analyzer = SentimentAnalyzer()
-        self.theme_analyzer = ThemeAnalyzer()
+        # Analyzers are created on first use so loading or validating data
+        # doesn't pay for the model load
+        self._sentiment_analyzer = None
+        self._theme_analyzer = None
         self.results = {}
+    
+    @property
+    def sentiment_analyzer(self):
+        if self._sentiment_analyzer is None:
+            self._sentiment_analyzer = _get_shared_sentiment_analyzer()
+        return self._sentiment_analyzer
+    
+    @property
+    def theme_analyzer(self):
+        if self._theme_analyzer is None:
+            self._theme_analyzer = _get_shared_theme_analyzer()
+        return self._theme_analyzer
         
     def load_task1_data(self):
         """Load and prepare Task 1 data for analysis"""
@@ -68,6 +93,8 @@ class Task2Pipeline:
         print("="*50)
         
         df_with_sentiment = self.sentiment_analyzer.add_sentiment_to_dataframe(df)
+        # Inference is done: free the model's (GPU) memory for the later stages
+        self.sentiment_analyzer.release()
         self.sentiment_analyzer.generate_sentiment_report(df_with_sentiment)
         
         # Save intermediate results
@@ -135,33 +162,29 @@ class Task2Pipeline:
         
         print(f"\n🎯 BUSINESS SCENARIOS INSIGHTS:")
         
+        # Flag every scenario theme in a single pass over the theme lists
+        complaint_themes = ['Login & Access Issues', 'Transaction Problems', 'App Performance & Speed']
+        tracked_themes = complaint_themes + ['Feature Requests']
+        theme_flags = pd.DataFrame(
+            [[bool(themes) and theme in themes for theme in tracked_themes]
+             for themes in df_themes['identified_themes']],
+            columns=tracked_themes, index=df_themes.index, dtype=bool
+        )
+        
         # Scenario 1: Retaining Users - Slow transfers analysis
-        transfer_reviews = df_themes[
-            df_themes['identified_themes'].apply(
-                lambda x: 'Transaction Problems' in x if x else False
-            )
-        ]
+        transfer_reviews = df_themes[theme_flags['Transaction Problems']]
         if len(transfer_reviews) > 0:
             transfer_sentiment = transfer_reviews['sentiment_numeric'].mean()
             print(f"   🔄 Transaction Issues: {len(transfer_reviews)} complaints")
             print(f"      Average sentiment: {transfer_sentiment:.3f} (negative)")
         
         # Scenario 2: Feature Requests analysis
-        feature_reviews = df_themes[
-            df_themes['identified_themes'].apply(
-                lambda x: 'Feature Requests' in x if x else False
-            )
-        ]
-        if len(feature_reviews) > 0:
-            print(f"   💡 Feature Requests: {len(feature_reviews)} suggestions")
+        feature_count = int(theme_flags['Feature Requests'].sum())
+        if feature_count > 0:
+            print(f"   💡 Feature Requests: {feature_count} suggestions")
         
         # Scenario 3: Complaint clustering
-        complaint_themes = ['Login & Access Issues', 'Transaction Problems', 'App Performance & Speed']
-        complaint_count = len(df_themes[
-            df_themes['identified_themes'].apply(
-                lambda x: any(theme in x for theme in complaint_themes) if x else False
-            )
-        ])
+        complaint_count = int(theme_flags[complaint_themes].any(axis=1).sum())
         print(f"   🗣️  Total complaints identified: {complaint_count}")
         
         print(f"\n💾 OUTPUT FILES:")
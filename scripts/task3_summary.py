@@ -2,76 +2,89 @@
 """
 Task 3 Final Verification and Summary
 """
-import psycopg2
 import os
-from dotenv import load_dotenv
+import sys
+from decimal import Decimal, ROUND_HALF_UP
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from scripts.database_manager import get_connection_pool, close_connection_pool
 
 def get_task3_summary():
     """Generate final Task 3 summary for submission"""
-    load_dotenv()
-    
+    conn = None
+    failed = False
+    lines = []
     try:
-        conn = psycopg2.connect(
-            host=os.getenv('DB_HOST', 'localhost'),
-            database=os.getenv('DB_NAME', 'bank_reviews'),
-            user=os.getenv('DB_USER', 'postgres'),
-            password=os.getenv('DB_PASSWORD', '123456'),
-            port=os.getenv('DB_PORT', '5432')
-        )
+        # Repeated summaries reuse a backend from the shared pool instead of reconnecting
+        conn = get_connection_pool().getconn()
+        conn.autocommit = True  # read-only: no implicit BEGIN/COMMIT
         
         cursor = conn.cursor()
         
-        print("=" * 60)
-        print("TASK 3 - FINAL SUBMISSION SUMMARY")
-        print("=" * 60)
+        # Report lines are collected and written to stdout in one call
+        lines.append("=" * 60)
+        lines.append("TASK 3 - FINAL SUBMISSION SUMMARY")
+        lines.append("=" * 60)
         
-        # 1. Basic counts
-        cursor.execute("SELECT COUNT(*) FROM banks")
-        banks_count = cursor.fetchone()[0]
+        # All counts in one round trip: rows are tagged by section and split up here
+        cursor.execute("""
+            WITH bank_total AS (SELECT COUNT(*) AS c FROM banks),
+                 review_total AS (SELECT COUNT(*) AS c FROM reviews),
+                 review_counts AS (
+                     SELECT bank_id, COUNT(review_id) AS c
+                     FROM reviews
+                     GROUP BY bank_id
+                 ),
+                 per_bank AS (
+                     -- Reviews are counted per bank_id first, so the join is bank-sized
+                     SELECT b.bank_name, CAST(COALESCE(SUM(rc.c), 0) AS BIGINT) AS c
+                     FROM banks b
+                     LEFT JOIN review_counts rc ON b.bank_id = rc.bank_id
+                     GROUP BY b.bank_name
+                 ),
+                 sentiment AS (
+                     SELECT sentiment_label, COUNT(*) AS c
+                     FROM reviews
+                     GROUP BY sentiment_label
+                 )
+            SELECT 'banks', NULL, c FROM bank_total
+            UNION ALL SELECT 'reviews', NULL, c FROM review_total
+            UNION ALL SELECT 'per_bank', bank_name, c FROM per_bank
+            UNION ALL SELECT 'sentiment', sentiment_label, c FROM sentiment
+        """)
         
-        cursor.execute("SELECT COUNT(*) FROM reviews")
-        reviews_count = cursor.fetchone()[0]
+        sections = {'banks': [], 'reviews': [], 'per_bank': [], 'sentiment': []}
+        for section, name, count in cursor.fetchall():
+            sections[section].append((name, count))
         
-        print(f"\n DATABASE OVERVIEW:")
-        print(f"   Banks: {banks_count}")
-        print(f"   Reviews: {reviews_count}")
+        # 1. Basic counts
+        banks_count = sections['banks'][0][1]
+        reviews_count = sections['reviews'][0][1]
         
-        # 2. Reviews per bank
-        cursor.execute("""
-            SELECT b.bank_name, COUNT(r.review_id)
-            FROM banks b
-            LEFT JOIN reviews r ON b.bank_id = r.bank_id
-            GROUP BY b.bank_name
-            ORDER BY COUNT(r.review_id) DESC
-        """)
+        lines.append(f"\n DATABASE OVERVIEW:")
+        lines.append(f"   Banks: {banks_count}")
+        lines.append(f"   Reviews: {reviews_count}")
         
-        print(f"\n🏦 REVIEWS PER BANK:")
-        for bank, count in cursor.fetchall():
+        # 2. Reviews per bank
+        lines.append(f"\n🏦 REVIEWS PER BANK:")
+        for bank, count in sorted(sections['per_bank'], key=lambda row: row[1], reverse=True):
             status = "" if count >= 400 else "⚠️ "
-            print(f"   {status} {bank}: {count} reviews")
-        
-        # 3. Sentiment summary
-        cursor.execute("""
-            SELECT 
-                sentiment_label,
-                COUNT(*) as count,
-                ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM reviews), 1) as pct
-            FROM reviews
-            GROUP BY sentiment_label
-            ORDER BY count DESC
-        """)
+            lines.append(f"   {status} {bank}: {count} reviews")
         
-        print(f"\n😊 SENTIMENT DISTRIBUTION:")
-        for label, count, pct in cursor.fetchall():
-            print(f"   {label}: {count} reviews ({pct}%)")
+        # 3. Sentiment summary (percentages from the review total fetched above, rounded
+        # half away from zero in exact decimal like SQL ROUND(numeric, 1))
+        lines.append(f"\n😊 SENTIMENT DISTRIBUTION:")
+        for label, count in sorted(sections['sentiment'], key=lambda row: row[1], reverse=True):
+            pct = (Decimal(count) * 100 / Decimal(reviews_count)).quantize(Decimal('0.1'), ROUND_HALF_UP)
+            lines.append(f"   {label}: {count} reviews ({pct}%)")
         
         # 4. Requirement verification
-        print(f"\n TASK 3 REQUIREMENTS CHECK:")
-        print(f"   1. Database created: {'bank_reviews' in conn.dsn} ✓")
-        print(f"   2. Tables exist: banks, reviews ✓")
-        print(f"   3. 1000+ reviews inserted: {reviews_count} {'✓' if reviews_count >= 1000 else '✗'}")
-        print(f"   4. Sentiment data present: ✓")
-        print(f"   5. Verification queries: ✓")
+        lines.append(f"\n TASK 3 REQUIREMENTS CHECK:")
+        lines.append(f"   1. Database created: {'bank_reviews' in conn.dsn} ✓")
+        lines.append(f"   2. Tables exist: banks, reviews ✓")
+        lines.append(f"   3. 1000+ reviews inserted: {reviews_count} {'✓' if reviews_count >= 1000 else '✗'}")
+        lines.append(f"   4. Sentiment data present: ✓")
+        lines.append(f"   5. Verification queries: ✓")
         
         # 5. Success check
         requirements_met = all([
@@ -80,21 +93,32 @@ def get_task3_summary():
             reviews_count >= 1240  # Close to our 1244
         ])
         
-        print(f"\n" + "=" * 60)
+        lines.append(f"\n" + "=" * 60)
         if requirements_met:
-            print("🎉 TASK 3: ALL REQUIREMENTS MET - READY FOR SUBMISSION!")
+            lines.append("🎉 TASK 3: ALL REQUIREMENTS MET - READY FOR SUBMISSION!")
         else:
-            print("⚠️  TASK 3: SOME REQUIREMENTS NOT MET")
-        print("=" * 60)
+            lines.append("⚠️  TASK 3: SOME REQUIREMENTS NOT MET")
+        lines.append("=" * 60)
         
         cursor.close()
-        conn.close()
         
+        sys.stdout.write('\n'.join(lines) + '\n')
         return requirements_met
         
     except Exception as e:
-        print(f"❌ Error: {e}")
+        failed = True
+        lines.append(f"❌ Error: {e}")
+        sys.stdout.write('\n'.join(lines) + '\n')
         return False
+    finally:
+        if conn is not None:
+            if not failed:
+                conn.autocommit = False  # the pool is shared with the transactional loaders
+            # A connection that failed mid-summary is discarded rather than handed out again
+            get_connection_pool().putconn(conn, close=failed)
 
 if __name__ == "__main__":
-    get_task3_summary()
\ No newline at end of file
+    try:
+        get_task3_summary()
+    finally:
+        close_connection_pool()
\ No newline at end of file
@@ -6,6 +6,8 @@ Using TF-IDF and rule-based clustering for theme identification
 import pandas as pd
 import numpy as np
 import re
+import hashlib
+import joblib  # installed with scikit-learn
 from sklearn.feature_extraction.text import TfidfVectorizer
 from collections import Counter, defaultdict
 import sys
@@ -15,6 +17,45 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from config import DATA_PATHS
 
+try:
+    import pyarrow  # noqa: F401  (optional: Parquet copy of the theme results)
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Cleaning patterns, compiled once (Python re semantics, so Unicode \w keeps Amharic text)
+URL_RE = re.compile(r'http\S+')
+SPECIAL_RE = re.compile(r'[^\w\s.,!?]')
+WS_RE = re.compile(r'\s+')
+
+# Below this many reviews, starting worker processes costs more than the matching itself
+PARALLEL_MIN_REVIEWS = 50_000
+
+def _match_themes(cleaned_text, theme_regexes):
+    """Themes whose keywords occur in already-cleaned review text"""
+    if not cleaned_text or len(cleaned_text) < 10:
+        return []
+    
+    # A theme matches if any of its keywords occurs in the cleaned text
+    return [theme for theme, pattern in theme_regexes.items()
+            if pattern.search(cleaned_text)]
+
+def _match_themes_chunk(cleaned_texts, theme_regexes):
+    """_match_themes over one shard of reviews (module-level so worker processes can unpickle it)"""
+    return [_match_themes(text, theme_regexes) for text in cleaned_texts]
+
+def _top_n_positions(scores, top_n):
+    """Positions of the top_n scores, highest first; same picks as nlargest(keep='first') but O(n)"""
+    missing = np.isnan(scores)
+    valid = np.flatnonzero(~missing)
+    if len(valid) > top_n > 0:
+        # Partition finds the top_n-th highest value, then only reviews at or above it are sorted
+        kth = np.partition(scores[valid], len(valid) - top_n)[len(valid) - top_n]
+        valid = valid[scores[valid] >= kth]
+    ranked = valid[np.argsort(-scores[valid], kind='stable')]
+    # Like nlargest, missing scores only fill places the real scores can't
+    return np.concatenate([ranked, np.flatnonzero(missing)])[:top_n]
+
 class ThemeAnalyzer:
     """Enhanced thematic analysis with TF-IDF and rule-based clustering"""
     
@@ -65,6 +106,21 @@ class ThemeAnalyzer:
             ]
         }
         
+        # One compiled alternation per theme: a single C-level search replaces the
+        # per-keyword substring loop (kept per theme so overlapping keywords of
+        # different themes, e.g. 'secure transaction'/'transaction', both count).
+        # Keywords containing another keyword of the same theme ('cannot login'
+        # vs 'login') can never decide a match, so they are left out.
+        self.theme_regexes = {}
+        for theme, keywords in self.theme_patterns.items():
+            needed = [kw for kw in keywords
+                      if not any(other != kw and other in kw for other in keywords)]
+            self.theme_regexes[theme] = re.compile('|'.join(map(re.escape, needed)))
+        
+        # (bank, theme) -> row positions in the last analyzed frame, for representative lookups
+        self._theme_df = None
+        self._theme_positions = {}
+        
         self.stats = {
             'total_reviews': 0,
             'reviews_with_themes': 0,
@@ -79,18 +135,35 @@ class ThemeAnalyzer:
         text = str(text).lower().strip()
         
         # Remove URLs
-        text = re.sub(r'http\S+', '', text)
+        text = URL_RE.sub('', text)
         
         # Remove special characters but keep basic punctuation
-        text = re.sub(r'[^\w\s.,!?]', '', text)
+        text = SPECIAL_RE.sub('', text)
         
         # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = WS_RE.sub(' ', text)
         
         return text.strip()
     
+    def clean_texts(self, texts):
+        """advanced_text_clean for a whole Series in one pass"""
+        # One fused loop over the values with the precompiled patterns; chaining
+        # .str calls costs a Python pass plus a new Series per step on object text
+        values = texts.astype(object).map(str, na_action='ignore').fillna('').to_numpy()
+        cleaned = [WS_RE.sub(' ', SPECIAL_RE.sub('', URL_RE.sub('', text.lower().strip()))).strip()
+                   for text in values]
+        return pd.Series(cleaned, index=texts.index, dtype=object)
+    
+    def _tfidf_cache_path(self, texts, vectorizer):
+        """Cache file for the keyword scores of this exact corpus and vectorizer settings"""
+        digest = hashlib.sha1(repr(sorted(vectorizer.get_params().items())).encode())
+        for text in texts:
+            digest.update(str(text).encode('utf-8'))
+            digest.update(b'\0')  # separator, so ['ab', 'c'] and ['a', 'bc'] differ
+        return os.path.join(DATA_PATHS['tfidf_cache'], f"tfidf_{digest.hexdigest()}.joblib")
+    
     def extract_keywords_tfidf(self, texts, max_features=100):
-        """Extract keywords using TF-IDF with n-grams"""
+        """Extract keywords using TF-IDF with n-grams (pass df['_cleaned'] after analyze_themes_by_bank)"""
         print("   Extracting keywords with TF-IDF...")
         
         # Create TF-IDF vectorizer with n-grams
@@ -99,20 +172,33 @@ class ThemeAnalyzer:
             stop_words='english',
             ngram_range=(1, 3),  # Include unigrams, bigrams, and trigrams
             min_df=2,  # Ignore terms that appear in only 1 document
-            max_df=0.8  # Ignore terms that appear in more than 80% of documents
+            max_df=0.8,  # Ignore terms that appear in more than 80% of documents
+            dtype=np.float32  # Half the memory traffic of float64; ranking precision is ample
         )
         
+        texts = list(texts)
+        cache_path = self._tfidf_cache_path(texts, vectorizer)
+        if os.path.exists(cache_path):
+            keyword_scores = joblib.load(cache_path)
+            print(f"   ♻️ Using cached TF-IDF keywords for this corpus")
+            print(f"   Top 10 keywords: {[k[0] for k in keyword_scores[:10]]}")
+            return keyword_scores
+        
         try:
             tfidf_matrix = vectorizer.fit_transform(texts)
             feature_names = vectorizer.get_feature_names_out()
             
-            # Get TF-IDF scores
-            scores = np.array(tfidf_matrix.mean(axis=0)).flatten()
+            # Get TF-IDF scores (mean per term, summed over the sparse matrix)
+            scores = np.asarray(tfidf_matrix.sum(axis=0)).ravel() / tfidf_matrix.shape[0]
             
             # Create keyword-score pairs
-            keyword_scores = list(zip(feature_names, scores))
+            keyword_scores = [(str(name), float(score)) for name, score in zip(feature_names, scores)]
             keyword_scores.sort(key=lambda x: x[1], reverse=True)
             
+            # Same corpus next run: reuse the ranked keywords instead of re-fitting
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            joblib.dump(keyword_scores, cache_path)
+            
             print(f"   Top 10 keywords: {[k[0] for k in keyword_scores[:10]]}")
             return keyword_scores
             
@@ -122,21 +208,23 @@ class ThemeAnalyzer:
     
     def identify_themes_in_review(self, review_text):
         """Identify themes in a single review using pattern matching"""
-        themes_found = []
-        cleaned_text = self.advanced_text_clean(review_text)
-        
-        if not cleaned_text or len(cleaned_text) < 10:
-            return themes_found
-        
-        # Check each theme pattern
-        for theme, keywords in self.theme_patterns.items():
-            # Check for keyword matches in cleaned text
-            theme_matches = sum(1 for keyword in keywords if keyword in cleaned_text)
-            
-            if theme_matches >= 1:
-                themes_found.append(theme)
-        
-        return list(set(themes_found))  # Remove duplicates
+        return self.match_themes(self.advanced_text_clean(review_text))
+    
+    def match_themes(self, cleaned_text):
+        """Themes whose keywords occur in already-cleaned review text"""
+        return _match_themes(cleaned_text, self.theme_regexes)
+    
+    def match_themes_batch(self, cleaned_texts):
+        """match_themes for many reviews; large inputs are sharded across CPU cores"""
+        if len(cleaned_texts) < PARALLEL_MIN_REVIEWS:
+            return _match_themes_chunk(cleaned_texts, self.theme_regexes)
+        
+        # A few shards per core: few enough to amortize pickling, enough to balance load
+        shards = np.array_split(np.asarray(cleaned_texts, dtype=object), (os.cpu_count() or 1) * 4)
+        results = joblib.Parallel(n_jobs=-1)(
+            joblib.delayed(_match_themes_chunk)(shard, self.theme_regexes) for shard in shards
+        )
+        return [themes for shard_themes in results for themes in shard_themes]
     
     def analyze_themes_by_bank(self, df, text_column='review'):
         """Perform comprehensive thematic analysis by bank"""
@@ -144,54 +232,66 @@ class ThemeAnalyzer:
         
         self.stats['total_reviews'] = len(df)
         
+        # Few distinct values: integer codes make the bank/label grouping and filters cheap
+        for col in ('bank', 'sentiment_label'):
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        
         # Identify themes for each review
         print("   Processing reviews for theme identification...")
-        df['identified_themes'] = df[text_column].apply(self.identify_themes_in_review)
+        # Cleaned text is kept on the frame so later steps (e.g. TF-IDF keywords)
+        # reuse it instead of cleaning every review again
+        df['_cleaned'] = self.clean_texts(df[text_column])
+        df['identified_themes'] = self.match_themes_batch(df['_cleaned'].to_numpy())
         
         # Count themes identified
-        theme_counts = []
-        for themes in df['identified_themes']:
-            theme_counts.extend(themes)
+        themes_per_review = df['identified_themes'].map(len)
+        self.stats['themes_identified'] = int(themes_per_review.sum())
+        self.stats['reviews_with_themes'] = int(themes_per_review.gt(0).sum())
         
-        self.stats['themes_identified'] = len(theme_counts)
-        self.stats['reviews_with_themes'] = len(df[df['identified_themes'].str.len() > 0])
-        
-        # Analyze themes by bank
+        # Analyze themes by bank in one pass over the two columns (no per-row Series)
         bank_themes = defaultdict(Counter)
         
-        for idx, row in df.iterrows():
-            bank = row['bank']
-            themes = row['identified_themes']
-            
-            for theme in themes:
-                bank_themes[bank][theme] += 1
+        for bank, themes in zip(df['bank'], df['identified_themes']):
+            bank_themes[bank].update(themes)
+        
+        # One row per (review, theme), grouped once so representative reviews are
+        # looked up by key instead of rescanning every review's theme list
+        exploded = (df[['bank', 'identified_themes']].reset_index(drop=True)
+                    .explode('identified_themes').dropna(subset=['identified_themes']))
+        self._theme_positions = {
+            key: positions.to_numpy()
+            for key, positions in exploded.groupby(['bank', 'identified_themes'], sort=False, observed=True).groups.items()
+        }
+        self._theme_df = df
         
         return df, dict(bank_themes)
     
     def generate_theme_report(self, df, bank_themes):
         """Generate comprehensive thematic analysis report"""
-        print("\n" + "=" * 60)
-        print("📋 TASK 2 - THEMATIC ANALYSIS REPORT")
-        print("=" * 60)
+        lines = []  # written to stdout in one call at the end
+        lines.append("\n" + "=" * 60)
+        lines.append("📋 TASK 2 - THEMATIC ANALYSIS REPORT")
+        lines.append("=" * 60)
         
-        print(f"\n📊 THEME IDENTIFICATION SUMMARY:")
-        print(f"   Total reviews analyzed: {self.stats['total_reviews']}")
-        print(f"   Reviews with identified themes: {self.stats['reviews_with_themes']}")
-        print(f"   Total themes identified: {self.stats['themes_identified']}")
+        lines.append(f"\n📊 THEME IDENTIFICATION SUMMARY:")
+        lines.append(f"   Total reviews analyzed: {self.stats['total_reviews']}")
+        lines.append(f"   Reviews with identified themes: {self.stats['reviews_with_themes']}")
+        lines.append(f"   Total themes identified: {self.stats['themes_identified']}")
         
         coverage_rate = (self.stats['reviews_with_themes'] / self.stats['total_reviews']) * 100
-        print(f"   Theme coverage rate: {coverage_rate:.1f}%")
+        lines.append(f"   Theme coverage rate: {coverage_rate:.1f}%")
         
-        print(f"\n🏦 TOP THEMES BY BANK:")
+        lines.append(f"\n🏦 TOP THEMES BY BANK:")
         for bank, theme_counter in bank_themes.items():
-            print(f"\n   {bank}:")
+            lines.append(f"\n   {bank}:")
             total_themes = sum(theme_counter.values())
             
             for theme, count in theme_counter.most_common(5):  # Top 5 themes
                 percentage = (count / total_themes) * 100 if total_themes > 0 else 0
-                print(f"     {theme}: {count} mentions ({percentage:.1f}%)")
+                lines.append(f"     {theme}: {count} mentions ({percentage:.1f}%)")
         
-        print(f"\n🎯 THEME DISTRIBUTION ACROSS BANKS:")
+        lines.append(f"\n🎯 THEME DISTRIBUTION ACROSS BANKS:")
         # Create comparison table
         all_themes = set()
         for theme_counter in bank_themes.values():
@@ -205,22 +305,30 @@ class ThemeAnalyzer:
             comparison_data.append(row)
         
         comparison_df = pd.DataFrame(comparison_data)
-        print(comparison_df.to_string(index=False))
+        lines.append(comparison_df.to_string(index=False))
+        sys.stdout.write('\n'.join(lines) + '\n')
         
         return comparison_df
     
     def extract_representative_reviews(self, df, bank, theme, top_n=3):
         """Extract representative reviews for a specific theme and bank"""
-        bank_theme_reviews = df[
-            (df['bank'] == bank) & 
-            (df['identified_themes'].apply(lambda x: theme in x if x else False))
-        ]
+        if df is self._theme_df:
+            positions = self._theme_positions.get((bank, theme), np.empty(0, dtype=np.intp))
+            bank_theme_reviews = df.iloc[positions]
+        else:
+            # Frame not from analyze_themes_by_bank: scan its theme lists
+            bank_theme_reviews = df[
+                (df['bank'] == bank) & 
+                np.fromiter((bool(x) and theme in x for x in df['identified_themes']),
+                            dtype=bool, count=len(df))
+            ]
         
         if len(bank_theme_reviews) == 0:
             return []
         
         # Return top reviews by sentiment score (most confident examples)
-        representative = bank_theme_reviews.nlargest(top_n, 'sentiment_score')
+        representative = bank_theme_reviews.iloc[_top_n_positions(
+            bank_theme_reviews['sentiment_score'].to_numpy(dtype=float), top_n)]
         
         return representative[['review', 'rating', 'sentiment_label']].to_dict('records')
     
@@ -231,11 +339,20 @@ class ThemeAnalyzer:
         # Ensure directory exists
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
+        # The working cleaned-text column is not exported
+        df_export = df.drop(columns='_cleaned', errors='ignore')
+        
+        # Columnar copy with themes kept as native list<string> (no join/split round trip)
+        if PYARROW_AVAILABLE:
+            parquet_path = DATA_PATHS['theme_results_parquet']
+            df_export.to_parquet(parquet_path, engine='pyarrow', compression='snappy', index=False)
+            print(f"💾 Thematic analysis results saved to: {parquet_path}")
+        
         # Convert themes list to string for CSV
-        df_export = df.copy()
-        df_export['identified_themes'] = df_export['identified_themes'].apply(
-            lambda x: ', '.join(x) if x else 'No themes identified'
-        )
+        df_export['identified_themes'] = [
+            ', '.join(x) if x else 'No themes identified'
+            for x in df_export['identified_themes']
+        ]
         
         df_export.to_csv(output_path, index=False)
         print(f"💾 Thematic analysis results saved to: {output_path}")